@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 import sqlalchemy
 from sqlalchemy.orm import Session
 import re
@@ -6,14 +6,25 @@ from models import Base, CategoryInfo, User, engine, get_db
 from sqlalchemy import JSON, Boolean, Date, DateTime, Float, Integer, Table, Column, String, MetaData, insert, inspect
 from fastapi import Depends, HTTPException, Query
 from pydantic import BaseModel
-from typing import Dict, List, Literal
+from typing import Any, Dict, List, Literal
 from io import BytesIO
 import pandas as pd
 from sqlalchemy import text
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.sql.elements import quoted_name
-from schemas import AssetInput, CategoryCreate, CategoryDelete, ReassignAssetInput
+from schemas import AssetInput, BatchReassignInput, CategoryCreate, CategoryDelete, ReassignAssetInput
+from schema_registry import get_all_table_schemas, get_table_schema, invalidate_table_schema
+from indexes import create_field_indexes, wants_index
+from statements import delete_by, insert_row, select_by, select_in, select_keys_in, select_page, update_by
+from search_index import index_assets, reindex_asset, remove_assets, remove_category
+from lookup import asset_identifiers, register_assets, unregister_assets, unregister_category
+from history import record_deletes, record_inserts, record_updates
+from counters import bump_counters, read_counters, remove_category_counters, status_deltas
+from excel import frame_to_records, infer_column_type, iter_sheet_chunks, peak_rss_mb
+import base64
+import itertools
 import json
+import time
 
 metadata = MetaData()
 
@@ -39,6 +50,8 @@ def create_category(data: CategoryCreate, db: Session):
             status_code=400,
             detail="One of 'asset tag' or 'asset code' is required "
         )
+    # Leading primary key column; it is indexed by the key itself
+    primary_key = next(name for name in normalized_names if name in ["asset_tag", "asset_code"])
 
     # Remove table metadata if already exists
     if category in metadata.tables:
@@ -66,7 +79,7 @@ def create_category(data: CategoryCreate, db: Session):
 
         # Set as primary key if asset_tag or asset_code
         is_primary = name in ["asset_tag", "asset_code"]
-        columns.append(Column(name, col_type, primary_key=is_primary))
+        columns.append(Column(name, col_type, primary_key=is_primary, index=wants_index(name, field.indexed, primary_key)))
 
     # Create the table dynamically
     table = Table(category, metadata, *columns)
@@ -78,7 +91,7 @@ def create_category(data: CategoryCreate, db: Session):
     for field in fields:
         raw_name = field.name
         name = raw_name.lower().replace(" ", "_")
-        res.append({"name":name,"type":field.type})
+        res.append({"name":name,"type":field.type,"indexed":field.indexed})
 
 
     
@@ -89,110 +102,26 @@ def create_category(data: CategoryCreate, db: Session):
     )
     db.add(cat_info)
     db.commit()
+    invalidate_table_schema(category)
 
     return {"message": f"Category '{category}' created successfully"}
 
 
 
-def add_fields_to_category(data: CategoryCreate, db: Session):
-    category = data.category_name.lower().replace(" ", "_")
-    new_fields = data.fields  
-
-    if not new_fields:
-        raise HTTPException(status_code=400, detail="At least one new field is required")
-
-    # Check if table exists
-    if not engine.dialect.has_table(engine.connect(), category):
-        raise HTTPException(status_code=404, detail=f"Table '{category}' does not exist")
-
-    # Retrieve CategoryInfo from the database
-    cat_info = db.query(CategoryInfo).filter_by(tablename=category).first()
-    if not cat_info:
-        raise HTTPException(status_code=404, detail="Category info not found")
-
-    # Existing field names in CategoryInfo metadata
-    existing_field_names = {f['name'] for f in cat_info.tablefields}
-
-    # Check if new fields already exist
-    for field in new_fields:
-        if field.name in existing_field_names:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Field '{field.name}' already exists in category '{category}'"
-            )
-
-    # Add new fields to the main category table
-    added_fields = []
-    with engine.connect() as conn:
-        for field in new_fields:
-            sql_type = sql_type_map.get(field.type)
-            if not sql_type:
-                raise HTTPException(status_code=400, detail=f"Invalid field type: {field.type}")
-            try:
-                # Add new column to the category table
-                conn.execute(text(
-                    f'ALTER TABLE "{category}" ADD COLUMN "{field.name}" {sql_type().__visit_name__.upper()}'
-                ))
-                added_fields.append(field)
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"Failed to add field '{field.name}': {str(e)}")
-
-    # Combine existing fields with newly added fields for CategoryInfo metadata
-    updated_tablefields = cat_info.tablefields + [f.dict() for f in added_fields]
-
-    # Update CategoryInfo with the new fields (keeping existing ones)
-    cat_info.tablefields = updated_tablefields
-    db.commit()
-
-    return {
-        "message": f"Fields added to category '{category}'",
-        "added_fields": [f.name for f in added_fields],
-        "updated_fields": updated_tablefields
-    }
-
-
-
-def delete_field_from_category(category_name: str, field_name: str, db: Session):
-    inspector = sqlalchemy.inspect(db.bind)
-
-    if category_name not in inspector.get_table_names():
-        raise HTTPException(status_code=404, detail="Category does not exist")
-
-    # Check if the column exists in the actual table
-    columns = [col["name"] for col in inspector.get_columns(category_name)]
-    if field_name not in columns:
-        raise HTTPException(status_code=404, detail="Field does not exist in category")
-
-    # Drop the column, including if it is a primary key
-    alter_query = f'ALTER TABLE "{category_name}" DROP COLUMN "{field_name}"'
-    try:
-        db.execute(text(alter_query))
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to delete field: {str(e)}")
-
-    # Update JSON metadata in category_info
-    category_info = db.query(CategoryInfo).filter_by(tablename=category_name).first()
-    if category_info and isinstance(category_info.tablefields, list):
-        updated_fields = [
-            field for field in category_info.tablefields
-            if field.get("name") != field_name
-        ]
-        category_info.tablefields = updated_fields
-        db.commit()
-
-    return {"message": f"Field '{field_name}' deleted successfully from category '{category_name}'"}
-
-
 def delete_category(data: CategoryDelete, db: Session):
     table = data.category_name.lower().replace(" ", "_")
     try:
         db.execute(text(f'DROP TABLE IF EXISTS "{table}"'))
         db.query(CategoryInfo).filter(CategoryInfo.tablename == table).delete()
+        remove_category(db, table)
+        unregister_category(db, table)
+        remove_category_counters(db, table)
         db.commit()
     except Exception as e:
+        db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete category: {str(e)}")
+    finally:
+        invalidate_table_schema(table)
 
     return {"message": f"Category '{table}' deleted successfully"}
 
@@ -218,31 +147,29 @@ def add_asset(asset: BaseModel, db: Session):
         if not asset.table_name or not asset.data:
             raise HTTPException(status_code=400, detail="Table name and data required")
 
-        column_names = []
-        placeholders = []
-        bind_params = {}
-
-        # Correctly get column types using inspector
-        inspector = inspect(db.bind)
-        columns = {col["name"]: col["type"] for col in inspector.get_columns(asset.table_name)}
+        schema = get_table_schema(asset.table_name, db)
+        if not schema:
+            raise HTTPException(status_code=404, detail="Table not found")
 
-        for i, (col, value) in enumerate(asset.data.items()):
-            safe_key = f"param_{i}"
-            column_names.append(f'"{col}"')
-            placeholders.append(f":{safe_key}")
+        bind_params = {}
+        columns = schema["columns"]
 
-            col_type = str(columns.get(col, "")).lower()
+        for col, value in asset.data.items():
+            col_type = columns.get(col, "")
 
             if "date" in col_type:
                 try:
-                    bind_params[safe_key] = datetime.strptime(value, "%Y-%m-%d").date()
+                    bind_params[col] = datetime.strptime(value, "%Y-%m-%d").date()
                 except ValueError:
                     raise HTTPException(status_code=400, detail=f"Invalid date format for '{col}' (expected YYYY-MM-DD)")
             else:
-                bind_params[safe_key] = value
+                bind_params[col] = value
 
-        sql = text(f'INSERT INTO "{asset.table_name}" ({", ".join(column_names)}) VALUES ({", ".join(placeholders)})')
-        db.execute(sql, bind_params)
+        db.execute(insert_row(schema, bind_params), bind_params)
+        index_assets(db, asset.table_name, schema, [asset.data])
+        register_assets(db, asset.table_name, schema, [asset.data])
+        record_inserts(db, asset.table_name, schema, [bind_params])
+        bump_counters(db, asset.table_name, status_deltas([asset.data]))
         db.commit()
 
         return {"message": f"Asset added to {asset.table_name}"}
@@ -252,6 +179,160 @@ def add_asset(asset: BaseModel, db: Session):
         raise HTTPException(status_code=500, detail=f"Insert failed: {str(e)}")
 
 
+BULK_INSERT_CHUNK_SIZE = 500
+
+
+def _field_type(schema: dict, column: str) -> str:
+    # Prefer the category's own field definition, fall back to the catalog type
+    for field in schema["fields"]:
+        if normalize_column_name(field["name"]) == column:
+            return str(field["type"]).lower()
+    return schema["columns"].get(column, "")
+
+
+def column_coercer(type_name: str):
+    if "date" in type_name:
+        def to_date(value):
+            if isinstance(value, (date, datetime)):
+                return value if type(value) is date else value.date()
+            return datetime.strptime(str(value), "%Y-%m-%d").date()
+        return to_date
+    if "bool" in type_name:
+        def to_bool(value):
+            if isinstance(value, str):
+                if value.strip().lower() in ("true", "1", "yes", "y"):
+                    return True
+                if value.strip().lower() in ("false", "0", "no", "n", ""):
+                    return False
+                raise ValueError(f"not a boolean: {value!r}")
+            return bool(value)
+        return to_bool
+    if "int" in type_name:
+        return int
+    if "float" in type_name or "real" in type_name or "double" in type_name:
+        return float
+    return lambda value: value
+
+
+def add_assets_bulk(table_name: str, rows: List[Dict[str, Any]], db: Session, chunk_size: int = BULK_INSERT_CHUNK_SIZE):
+    schema = get_table_schema(table_name, db)
+    if not schema:
+        raise HTTPException(status_code=404, detail="Table not found")
+    if not rows:
+        raise HTTPException(status_code=400, detail="At least one row is required")
+
+    columns = schema["columns"]
+    key_columns = schema["key_columns"]
+
+    # Work out the column set and its coercers once for the whole batch
+    unknown = {col for row in rows for col in row if col not in columns}
+    insert_columns = [col for col in columns if any(col in row for row in rows)]
+    field_types = {col: _field_type(schema, col) for col in insert_columns}
+    coercers = {col: column_coercer(type_name) for col, type_name in field_types.items()}
+
+    results: List[Dict[str, Any]] = [None] * len(rows)
+    prepared = []
+    for i, row in enumerate(rows):
+        bad = [col for col in row if col in unknown]
+        if bad:
+            results[i] = {"row": i, "status": "invalid", "detail": f"Unknown column(s): {', '.join(bad)}"}
+            continue
+        params = {}
+        for col in insert_columns:
+            value = row.get(col)
+            try:
+                params[col] = coercers[col](value) if value is not None else None
+            except (TypeError, ValueError):
+                if "date" in field_types[col]:
+                    results[i] = {"row": i, "status": "invalid_date", "detail": f"Invalid date format for '{col}' (expected YYYY-MM-DD)"}
+                else:
+                    results[i] = {"row": i, "status": "invalid", "detail": f"Invalid value for '{col}'"}
+                break
+        else:
+            missing = [col for col in key_columns if params.get(col) is None]
+            if missing:
+                results[i] = {"row": i, "status": "invalid", "detail": f"Missing key column(s): {', '.join(missing)}"}
+            else:
+                prepared.append((i, params))
+
+    insert_stmt = insert_row(schema, insert_columns)
+    # Duplicates are checked on the whole primary key, which is
+    # (asset_tag, asset_code) when a category has both
+    check_keys = bool(key_columns) and all(col in insert_columns for col in key_columns)
+    key_lookup = select_keys_in(schema, key_columns) if check_keys else None
+
+    def key_of(params):
+        key = tuple(params[col] for col in key_columns)
+        if any(part is None for part in key):
+            return None
+        return key if len(key) > 1 else key[0]
+
+    seen_keys = set()
+    for start in range(0, len(prepared), chunk_size):
+        chunk = prepared[start:start + chunk_size]
+
+        # Flag keys that already exist or repeat inside the batch before inserting
+        existing = set()
+        if check_keys:
+            keys = [key for key in (key_of(params) for _, params in chunk) if key is not None]
+            if keys:
+                existing = {tuple(r) if len(r) > 1 else r[0] for r in db.execute(key_lookup, {"keys": keys})}
+
+        batch = []
+        for i, params in chunk:
+            key = key_of(params) if check_keys else None
+            if key is not None and (key in existing or key in seen_keys):
+                shown = "/".join(map(str, key)) if isinstance(key, tuple) else key
+                results[i] = {"row": i, "status": "duplicate_key", "detail": f"'{shown}' already exists"}
+                continue
+            if key is not None:
+                seen_keys.add(key)
+            batch.append((i, params))
+
+        if not batch:
+            continue
+        try:
+            db.execute(insert_stmt, [params for _, params in batch])
+            inserted_rows = [params for _, params in batch]
+            index_assets(db, table_name, schema, inserted_rows)
+            register_assets(db, table_name, schema, inserted_rows)
+            record_inserts(db, table_name, schema, inserted_rows)
+            bump_counters(db, table_name, status_deltas(inserted_rows))
+            db.commit()
+            for i, _ in batch:
+                results[i] = {"row": i, "status": "inserted"}
+        except IntegrityError:
+            # Someone else won a race on a key; retry this chunk row by row
+            db.rollback()
+            for i, params in batch:
+                try:
+                    with db.begin_nested():
+                        db.execute(insert_stmt, params)
+                        index_assets(db, table_name, schema, [params])
+                        register_assets(db, table_name, schema, [params])
+                        record_inserts(db, table_name, schema, [params])
+                        bump_counters(db, table_name, status_deltas([params]))
+                    results[i] = {"row": i, "status": "inserted"}
+                except IntegrityError as e:
+                    # Only a UNIQUE / primary key violation is a duplicate
+                    message = str(e.orig)
+                    duplicate = "unique" in message.lower() or "duplicate" in message.lower()
+                    results[i] = {"row": i, "status": "duplicate_key" if duplicate else "invalid", "detail": message}
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            for i, _ in batch:
+                results[i] = {"row": i, "status": "error", "detail": str(e)}
+
+    inserted = sum(1 for r in results if r["status"] == "inserted")
+    return {
+        "message": f"Inserted {inserted} of {len(rows)} rows into {table_name}",
+        "inserted": inserted,
+        "failed": len(rows) - inserted,
+        "results": results,
+    }
+
+
 def upload_excel_and_create_tables(file, db: Session):
     try:
         contents = file.file.read()
@@ -274,50 +355,32 @@ def upload_excel_and_create_tables(file, db: Session):
                     primary_key_found = col
                     break
 
-            # Define columns with appropriate data types
-            columns = []
-            for orig_col, norm_col in zip(original_columns, normalized_columns):
-                sample_value = df[orig_col].dropna().iloc[0] if not df[orig_col].dropna().empty else ""
-                dtype = String  # Default
-
-                if isinstance(sample_value, bool):
-                    dtype = Boolean
-                elif isinstance(sample_value, int):
-                    dtype = Integer
-                elif isinstance(sample_value, float):
-                    dtype = Float
-                elif isinstance(sample_value, pd.Timestamp):
-                    dtype = Date
-
-                col_args = {"primary_key": norm_col == primary_key_found}
-                columns.append(Column(norm_col, dtype, **col_args))
-
-            # Create the SQLAlchemy table
-            new_table = Table(table_name, metadata, *columns, extend_existing=True)
-            metadata.create_all(bind=engine, tables=[new_table])
-
-            # Insert or update CategoryInfo
-            category_fields = [{"name": n, "type": str(c.type)} for n, c in zip(normalized_columns, columns)]
-            existing = db.query(CategoryInfo).filter_by(tablename=table_name).first()
-            if existing:
-                existing.tablefields = category_fields
-            else:
-                cat_info = CategoryInfo(tablename=table_name, tablefields=category_fields)
-                db.add(cat_info)
-            db.commit()
+            # Define columns with data types inferred from the column values
+            dtypes = [infer_column_type(df[orig_col]) for orig_col in original_columns]
+
+            # Convert column by column. With a sampled inference some values
+            # may not fit the type; those columns are widened to String
+            # rather than storing NULL in place of the values
+            insert_data, lost = frame_to_records(df, normalized_columns, dtypes)
+            if lost:
+                print(f"Storing {', '.join(lost)} in {table_name} as text: values do not fit the inferred type")
+                dtypes = [String if col in lost else dtype for col, dtype in zip(normalized_columns, dtypes)]
+                insert_data, _ = frame_to_records(df, normalized_columns, dtypes)
 
-            # Insert data
-            insert_data = []
-            for _, row in df.iterrows():
-                row_dict = {}
-                for orig_col, norm_col in zip(original_columns, normalized_columns):
-                    value = row[orig_col]
-                    row_dict[norm_col] = str(value) if pd.notna(value) else None
-                insert_data.append(row_dict)
+            columns = [
+                Column(norm_col, dtype, primary_key=norm_col == primary_key_found)
+                for norm_col, dtype in zip(normalized_columns, dtypes)
+            ]
+            new_table = _create_sheet_table(table_name, columns, db)
 
             if insert_data:
+                schema = get_table_schema(table_name, db)
                 with engine.begin() as conn:
                     conn.execute(new_table.insert(), insert_data)
+                    index_assets(conn, table_name, schema, insert_data)
+                    register_assets(conn, table_name, schema, insert_data)
+                    record_inserts(conn, table_name, schema, insert_data)
+                    bump_counters(conn, table_name, status_deltas(insert_data))
                 print(f"Inserted {len(insert_data)} rows into table {table_name}")
             else:
                 print(f"No data to insert for table {table_name}")
@@ -328,24 +391,145 @@ def upload_excel_and_create_tables(file, db: Session):
         print(f"Exception during Excel upload: {e}")
         raise HTTPException(status_code=500, detail=f"Error uploading and creating tables: {str(e)}")
 
+def _create_sheet_table(table_name: str, columns: List[Column], db: Session) -> Table:
+    # Create the SQLAlchemy table
+    new_table = Table(table_name, metadata, *columns, extend_existing=True)
+    metadata.create_all(bind=engine, tables=[new_table])
+    primary_key = next((c.name for c in columns if c.primary_key), None)
+    with engine.begin() as conn:
+        create_field_indexes(conn, table_name, [c.name for c in columns if wants_index(c.name, primary_key=primary_key)])
+
+    # Insert or update CategoryInfo
+    category_fields = [{"name": c.name, "type": str(c.type)} for c in columns]
+    existing = db.query(CategoryInfo).filter_by(tablename=table_name).first()
+    if existing:
+        existing.tablefields = category_fields
+    else:
+        cat_info = CategoryInfo(tablename=table_name, tablefields=category_fields)
+        db.add(cat_info)
+    db.commit()
+    invalidate_table_schema(table_name)
+    return new_table
+
+
+EXCEL_STREAM_CHUNK_SIZE = 1000
+# Unconvertible values listed in an import error
+MAX_REPORTED_LOST_VALUES = 10
+
+
+def _lost_values_detail(frame: pd.DataFrame, lost: Dict[str, list], dtypes: list, columns: List[str], first_row: int) -> str:
+    # first_row is the data row number (1-based, header excluded) of frame's first row
+    types = dict(zip(columns, dtypes))
+    problems = [
+        f"data row {first_row + pos}: {values[pos]!r} in '{col}' is not a valid {types[col].__name__.lower()}"
+        for col, positions in lost.items() for values in [frame[col].tolist()] for pos in positions
+    ]
+    return "; ".join(problems[:MAX_REPORTED_LOST_VALUES]) + (
+        f" (and {len(problems) - MAX_REPORTED_LOST_VALUES} more)" if len(problems) > MAX_REPORTED_LOST_VALUES else ""
+    )
+
+
+def upload_excel_streaming(file, db: Session, chunk_size: int = EXCEL_STREAM_CHUNK_SIZE, progress=None, resume_from=(0, 0)):
+    # Same result as upload_excel_and_create_tables, but rows are read from a
+    # read-only workbook and inserted chunk by chunk, so memory stays bounded
+    # by chunk_size rather than by the size of the upload.
+    # `file` is an UploadFile or a plain binary file object. `progress` is
+    # called as progress(conn, sheets_done, sheet_rows) inside every chunk's
+    # transaction, so recorded progress never runs ahead of or behind the
+    # committed rows; `resume_from` is the (sheets_done, sheet_rows) of an
+    # interrupted run.
+    started = time.perf_counter()
+    sheets = []
+    total_rows = 0
+    skip_sheets, skip_rows = resume_from
+    try:
+        for sheet_index, (sheet_name, header, chunks) in enumerate(iter_sheet_chunks(getattr(file, "file", file), chunk_size)):
+            if sheet_index < skip_sheets:
+                continue
+            first_chunk = next(chunks, None)
+            if not first_chunk:
+                if progress:
+                    with engine.begin() as conn:
+                        progress(conn, sheet_index + 1, 0)
+                continue
+
+            table_name = sheet_name.strip().lower().replace(" ", "_")
+            normalized_columns = [normalize_column_name(col) for col in header]
+            primary_key_found = next((c for c in normalized_columns if c in ["asset_tag", "asset_code"]), None)
+
+            # Infer column types from the first chunk, using the same rules as the DataFrame import
+            first_frame = pd.DataFrame(first_chunk, columns=normalized_columns)
+            dtypes = [infer_column_type(first_frame[col]) for col in normalized_columns]
+            columns = [
+                Column(norm_col, dtype, primary_key=norm_col == primary_key_found)
+                for norm_col, dtype in zip(normalized_columns, dtypes)
+            ]
+
+            new_table = _create_sheet_table(table_name, columns, db)
+            schema = get_table_schema(table_name, db)
+
+            sheet_rows = 0
+            for chunk in itertools.chain([first_chunk], chunks):
+                # Rows committed before an interruption are not inserted again
+                if skip_rows:
+                    dropped = min(skip_rows, len(chunk))
+                    chunk, skip_rows = chunk[dropped:], skip_rows - dropped
+                    sheet_rows += dropped
+                    if not chunk:
+                        continue
+                frame = pd.DataFrame(chunk, columns=normalized_columns)
+                records, lost = frame_to_records(frame, normalized_columns, dtypes)
+                if lost:
+                    # Types come from the first chunk; a later value that does
+                    # not fit fails the sheet instead of being stored as NULL
+                    raise HTTPException(status_code=400, detail=f"Sheet '{sheet_name}': " + _lost_values_detail(
+                        frame, lost, dtypes, normalized_columns, first_row=sheet_rows + 1
+                    ))
+                with engine.begin() as conn:
+                    conn.execute(new_table.insert(), records)
+                    index_assets(conn, table_name, schema, records)
+                    register_assets(conn, table_name, schema, records)
+                    record_inserts(conn, table_name, schema, records)
+                    bump_counters(conn, table_name, status_deltas(records))
+                    if progress:
+                        progress(conn, sheet_index, sheet_rows + len(records))
+                sheet_rows += len(records)
+                total_rows += len(records)
+
+            if progress:
+                with engine.begin() as conn:
+                    progress(conn, sheet_index + 1, 0)
+            print(f"Inserted {sheet_rows} rows into table {table_name}")
+            sheets.append({"table": table_name, "rows": sheet_rows})
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Exception during streaming Excel upload: {e}")
+        raise HTTPException(status_code=500, detail=f"Error uploading and creating tables: {str(e)}")
+
+    elapsed = time.perf_counter() - started
+    return {
+        "message": "Excel uploaded successfully, and tables created with data.",
+        "sheets": sheets,
+        "rows_inserted": total_rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(total_rows / elapsed, 1) if elapsed > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
 def normalize_column_name(name: str) -> str:
     return name.strip().lower().replace(" ", "_")
 
 def search_asset(table_name: str, identifier: str, db: Session):
     try:
-        # Get category and fields as JSON
-        category = db.query(CategoryInfo).filter_by(tablename=table_name).first()
-        if not category:
+        schema = get_table_schema(table_name, db)
+        if not schema:
             raise HTTPException(status_code=404, detail="Table not found")
 
-        fields = category.tablefields  # JSON list like [{"name": "asset tag", "type": "string"}, ...]
-
         # Identify searchable fields like asset tag or code
-        searchable_fields = [
-            field["name"]
-            for field in fields
-            if field["name"].lower().replace(" ", "_") in ["asset_tag", "asset_code"]
-        ]
+        searchable_fields = schema["identifier_columns"]
 
         if not searchable_fields:
             raise HTTPException(status_code=400, detail="No searchable field (asset tag/code) found")
@@ -353,8 +537,7 @@ def search_asset(table_name: str, identifier: str, db: Session):
         # Try searching with each matching field
         for field in searchable_fields:
             try:
-                sql = text(f'SELECT * FROM "{table_name}" WHERE "{field}" = :identifier')
-                result = db.execute(sql, {"identifier": identifier}).fetchall()
+                result = db.execute(select_by(schema, [field]), {"identifier": identifier}).fetchall()
                 if result:
                     return [dict(row._mapping) for row in result]
             except Exception as inner_e:
@@ -367,24 +550,89 @@ def search_asset(table_name: str, identifier: str, db: Session):
         print("Search failed:", str(e))
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+ASSET_PAGE_MAX = 500
+
+
+def _encode_cursor(key) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"k": key}, default=str).encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))["k"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def list_assets(table_name: str, db: Session, cursor: str = None, limit: int = 50, fields: List[str] = None):
+    # Keyset pagination on the primary key: each page is an index range scan
+    # starting after the last key of the previous page, never an OFFSET.
+    # Composite keys (asset_tag, asset_code) are compared as a row value.
+    schema = get_table_schema(table_name, db)
+    if not schema:
+        raise HTTPException(status_code=404, detail="Table not found")
+
+    key = schema["key_columns"]
+    if not key:
+        raise HTTPException(status_code=400, detail=f"Table '{table_name}' has no asset tag/code key to page on")
+
+    if fields:
+        unknown = [f for f in fields if f not in schema["columns"]]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(unknown)}")
+        selected = [col for col in key if col not in fields] + fields
+    else:
+        selected = list(schema["columns"])
+
+    limit = max(1, min(limit, ASSET_PAGE_MAX))
+    params = {"limit": limit + 1}
+    if cursor:
+        after = _decode_cursor(cursor)
+        if not isinstance(after, list):
+            after = [after]
+        if len(after) != len(key):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        params.update({f"k{i}": value for i, value in enumerate(after)})
+
+    stmt = select_page(schema, key, selected, after=bool(cursor))
+    rows = [dict(row._mapping) for row in db.execute(stmt, params)]
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": rows,
+        "count": len(rows),
+        "next_cursor": _encode_cursor([rows[-1][col] for col in key]) if has_more else None,
+    }
+
+
 def delete_asset(table_name: str, identifier: str, db: Session):
     try:
-        # Get the table and its fields
-        category = db.query(CategoryInfo).filter_by(tablename=table_name).first()
-        if not category:
+        # Get the table and its identifier columns
+        schema = get_table_schema(table_name, db)
+        if not schema:
             raise HTTPException(status_code=404, detail="Table not found")
 
-        fields = category.tablefields.split(",")
-        searchable_fields = [f for f in fields if f.lower() in ["asset tag", "asset_code", "asset code", "asset_tag"]]
+        searchable_fields = schema["identifier_columns"]
 
         if not searchable_fields:
             raise HTTPException(status_code=400, detail="No searchable field (asset tag/code) found")
 
         for field in searchable_fields:
             try:
+                # Read what is about to go so the counters, lookup and history stay right
+                doomed = [
+                    dict(row._mapping)
+                    for row in db.execute(select_by(schema, [field]), {"identifier": identifier})
+                ]
+
                 # Try deleting based on the searchable field
-                sql = text(f'DELETE FROM "{table_name}" WHERE "{field}" = :identifier')
-                result = db.execute(sql, {"identifier": identifier})
+                result = db.execute(delete_by(schema, [field]), {"identifier": identifier})
+                if result.rowcount > 0:
+                    remove_assets(db, table_name, schema, doomed)
+                    unregister_assets(db, table_name, [i for row in doomed for i in asset_identifiers(row, schema)])
+                    bump_counters(db, table_name, status_deltas(doomed, sign=-1))
+                    record_deletes(db, table_name, schema, doomed)
                 db.commit()
 
                 if result.rowcount > 0:
@@ -401,6 +649,155 @@ def delete_asset(table_name: str, identifier: str, db: Session):
 
 
 
+REASSIGN_FIELDS = [
+    "user_name", "user_id", "email", "department", "location", "section",
+    "date_of_return", "date_of_reassign", "date_of_update", "remarks",
+]
+
+
+def _reassign_schema(table_name: str, db: Session) -> dict:
+    schema = get_table_schema(table_name, db)
+    if not schema:
+        raise HTTPException(status_code=404, detail="Table not found")
+
+    if not schema["identifier_columns"]:
+        raise HTTPException(
+            status_code=400,
+            detail="Table must have either 'asset tag' or 'asset code' column."
+        )
+
+    # Check if all fields exist in the table before proceeding
+    missing_fields = [field for field in REASSIGN_FIELDS if field not in schema["columns"]]
+    if missing_fields:
+        raise HTTPException(
+            status_code=400,
+            detail=f"The following fields are missing in the table '{table_name}': {', '.join(missing_fields)}"
+        )
+    return schema
+
+
+def reassign_asset_record(data: ReassignAssetInput, db: Session):
+    schema = _reassign_schema(data.table_name, db)
+
+    identifier_columns = schema["identifier_columns"]
+    asset = db.execute(select_by(schema, identifier_columns), {"identifier": data.identifier}).fetchone()
+    if not asset:
+        raise HTTPException(status_code=404, detail="Asset not found")
+
+    valid_fields = {k: getattr(data, k) for k in REASSIGN_FIELDS if getattr(data, k) is not None}
+    if not valid_fields:
+        raise HTTPException(status_code=400, detail="No valid fields to update.")
+
+    params = {f"set_{key}": value for key, value in valid_fields.items()}
+    params["identifier"] = data.identifier
+    db.execute(update_by(schema, valid_fields, identifier_columns), params)
+    record_updates(db, data.table_name, schema, [(dict(asset._mapping), valid_fields)])
+    reindex_asset(db, data.table_name, schema, data.identifier)
+    db.commit()
+
+    return {"message": f"Asset reassigned in table '{data.table_name}' for identifier '{data.identifier}'"}
+
+
+REASSIGN_BATCH_MAX = 5000
+
+
+def reassign_assets_batch(data: BatchReassignInput, db: Session):
+    schema = _reassign_schema(data.table_name, db)
+    identifier_columns = schema["identifier_columns"]
+
+    # identifier -> fields to set; a later entry for the same identifier wins
+    shared = data.changes.dict(exclude_none=True) if data.changes else {}
+    changes: Dict[str, Dict[str, Any]] = {}
+    for identifier in data.identifiers:
+        changes[identifier] = dict(shared)
+    for item in data.items:
+        changes[item.identifier] = {**shared, **item.dict(exclude_none=True, exclude={"identifier"})}
+
+    if not changes:
+        raise HTTPException(status_code=400, detail="No identifiers to reassign")
+    if len(changes) > REASSIGN_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {REASSIGN_BATCH_MAX} assets per batch")
+    empty = [identifier for identifier, fields in changes.items() if not fields]
+    if empty:
+        raise HTTPException(status_code=400, detail=f"No valid fields to update for: {', '.join(empty[:20])}")
+
+    # One existence check for the whole batch; the rows as they were feed the history
+    identifiers = list(changes)
+    found: Dict[str, Dict[str, Any]] = {}
+    for start in range(0, len(identifiers), BULK_INSERT_CHUNK_SIZE):
+        rows = db.execute(
+            select_in(schema, identifier_columns), {"identifiers": identifiers[start:start + BULK_INSERT_CHUNK_SIZE]}
+        )
+        for row in rows:
+            before = dict(row._mapping)
+            for col in identifier_columns:
+                if before.get(col) is not None:
+                    found[str(before[col])] = before
+
+    # Items sharing the same set of fields go out as one executemany UPDATE
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for identifier, fields in changes.items():
+        if identifier in found:
+            params = {f"set_{key}": value for key, value in fields.items()}
+            params["identifier"] = identifier
+            groups.setdefault(tuple(sorted(fields)), []).append(params)
+
+    try:
+        for set_columns, params in groups.items():
+            db.execute(update_by(schema, set_columns, identifier_columns), params)
+        updated = [identifier for identifier in identifiers if identifier in found]
+        record_updates(db, data.table_name, schema, [(found[i], changes[i]) for i in updated])
+        for start in range(0, len(updated), BULK_INSERT_CHUNK_SIZE):
+            rows = db.execute(
+                select_in(schema, identifier_columns), {"identifiers": updated[start:start + BULK_INSERT_CHUNK_SIZE]}
+            )
+            index_assets(db, data.table_name, schema, [dict(row._mapping) for row in rows])
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Reassignment failed: {str(e)}")
+
+    results = [
+        {"identifier": identifier, "status": "updated" if identifier in found else "not_found"}
+        for identifier in identifiers
+    ]
+    return {
+        "message": f"Reassigned {len(updated)} of {len(identifiers)} assets in table '{data.table_name}'",
+        "updated": len(updated),
+        "not_found": len(identifiers) - len(updated),
+        "results": results,
+    }
+
+
+def get_dashboard_stats(db: Session):
+    schemas = get_all_table_schemas(db)
+    total_users = db.query(User).count()
+
+    # Asset stats, from the materialized counters table
+    counters = read_counters(db)
+    total_assets = 0
+    asset_counts_by_category: Dict[str, int] = {}
+    active_asset_counts_by_category: Dict[str, int] = {}
+    status_counts_by_category: Dict[str, Dict[str, int]] = {}
+
+    for table_name in schemas:
+        by_status = counters.get(table_name, {})
+        total_count = sum(by_status.values())
+        asset_counts_by_category[table_name] = total_count
+        active_asset_counts_by_category[table_name] = by_status.get("Active", 0)
+        status_counts_by_category[table_name] = {k: v for k, v in by_status.items() if k and v}
+        total_assets += total_count
+
+    return {
+        "categories": len(schemas),
+        "assets": total_assets,
+        "users": total_users,
+        "asset_counts_by_category": asset_counts_by_category,
+        "active_asset_counts_by_category": active_asset_counts_by_category,
+        "status_counts_by_category": status_counts_by_category
+    }
+
+
 def normalize(field: str) -> str:
     return field.replace(" ", "").replace("_", "").lower()
 
@@ -0,0 +1,39 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import asset
+import lookup
+from schemas import BatchReassignInput, ReassignAssetInput
+
+# Async entry points for the hot asset endpoints. Each call runs the regular
+# sync implementation through AsyncSession.run_sync: the SQL goes out over the
+# async driver (aiosqlite / asyncpg) and every wait on the database yields to
+# the event loop, so a worker serves many lookups at once without a thread per
+# request, and the registry/search-index/counter logic stays in one place.
+
+
+async def search_asset(table_name: str, identifier: str, db: AsyncSession):
+    return await db.run_sync(lambda session: asset.search_asset(table_name, identifier, session))
+
+
+async def add_asset(data, db: AsyncSession):
+    return await db.run_sync(lambda session: asset.add_asset(data, session))
+
+
+async def delete_asset(table_name: str, identifier: str, db: AsyncSession):
+    return await db.run_sync(lambda session: asset.delete_asset(table_name, identifier, session))
+
+
+async def reassign_asset(data: ReassignAssetInput, db: AsyncSession):
+    return await db.run_sync(lambda session: asset.reassign_asset_record(data, session))
+
+
+async def reassign_assets_batch(data: BatchReassignInput, db: AsyncSession):
+    return await db.run_sync(lambda session: asset.reassign_assets_batch(data, session))
+
+
+async def get_dashboard_stats(db: AsyncSession):
+    return await db.run_sync(asset.get_dashboard_stats)
+
+
+async def lookup_asset(identifier: str, db: AsyncSession):
+    return await db.run_sync(lambda session: lookup.lookup_asset(identifier, session))
@@ -1,7 +1,12 @@
-from passlib.context import CryptContext
+import os
+import threading
+import time
+import uuid
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException
-from models import User, get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import RevokedToken, User, get_async_db, get_db
+from passwords import hash_password, hashing_slot, verify_and_update
 from datetime import datetime, timedelta
 from fastapi.security import OAuth2PasswordBearer
 from jose.exceptions import JWTError
@@ -12,36 +17,168 @@ SECRET_KEY = "your-secret-key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 120
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# "claims": authorize from the signed token plus a TTL'd in-process user cache
+# "db": look the user up on every request
+AUTH_MODE = os.getenv("AUTH_MODE", "claims")
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+REVOCATION_REFRESH_SECONDS = int(os.getenv("REVOCATION_REFRESH_SECONDS", "30"))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+
+class TokenUser:
+    # What endpoints need from the current user, without an ORM instance
+    def __init__(self, username: str, mail: str, role: str):
+        self.username = username
+        self.mail = mail
+        self.role = role
+
+
+_user_cache = {}        # mail -> (TokenUser or None, monotonic expiry)
+_revoked_jtis = {}      # jti -> token expiry
+_revoked_before = {}    # mail -> epoch seconds; older tokens are rejected
+_revocations_loaded_at = None
+_auth_lock = threading.Lock()
+
+
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return hash_password(password)
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    verified, _ = verify_and_update(plain_password, hashed_password)
+    return verified
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+
+def _refresh_revocations(db: Session, force: bool = False):
+    # Revocations are persisted so every worker process sees them; each
+    # process re-reads the (small, unexpired) list at most every few seconds
+    global _revocations_loaded_at
+    now = time.monotonic()
+    if not force and _revocations_loaded_at is not None and now - _revocations_loaded_at < REVOCATION_REFRESH_SECONDS:
+        return
+    rows = db.query(RevokedToken).filter(RevokedToken.expires_at > datetime.utcnow()).all()
+    jtis, before = {}, {}
+    for row in rows:
+        if row.jti:
+            jtis[row.jti] = row.expires_at
+        else:
+            cutoff = (row.revoked_at - datetime(1970, 1, 1)).total_seconds()
+            before[row.mail] = max(before.get(row.mail, 0), cutoff)
+    with _auth_lock:
+        _revoked_jtis.clear()
+        _revoked_jtis.update(jtis)
+        _revoked_before.clear()
+        _revoked_before.update(before)
+        _revocations_loaded_at = now
+
+
+def _cached_user(mail: str, db: Session):
+    entry = _user_cache.get(mail)
+    if entry and entry[1] > time.monotonic():
+        return entry[0]
+    user = db.query(User).filter(User.mail == mail).first()
+    snapshot = TokenUser(user.username, user.mail, user.role) if user else None
+    with _auth_lock:
+        _user_cache[mail] = (snapshot, time.monotonic() + USER_CACHE_TTL_SECONDS)
+    return snapshot
+
+
+def invalidate_user(mail: str):
+    with _auth_lock:
+        _user_cache.pop(mail, None)
+
+
+def decode_token(token: str) -> dict:
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+
 def get_current_user(token: str = Depends(oauth2_scheme),db:Session=Depends(get_db)):
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         email = payload.get("sub")
-        user = db.query(User).filter(User.mail == email).first()
+
+        if AUTH_MODE != "claims":
+            user = db.query(User).filter(User.mail == email).first()
+            if not user:
+                raise HTTPException(status_code=401, detail="User not found")
+            return user
+
+        _refresh_revocations(db)
+        if payload.get("jti") in _revoked_jtis:
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+        # The cutoff only applies to users who had all their tokens revoked
+        if email in _revoked_before and payload.get("iat", 0) <= _revoked_before[email]:
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+
+        user = _cached_user(email, db)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
+        if user.role != payload.get("role"):
+            raise HTTPException(status_code=401, detail="Token is out of date, please log in again")
 
         return user
 
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    # Same checks for async endpoints; the cache means most calls never touch the db
+    return await db.run_sync(lambda session: get_current_user(token, session))
+
 def require_admin(user=Depends(get_current_user)):
-    if user["role"] != "admin":
+    if user.role.lower() != "admin":
         raise HTTPException(status_code=403, detail="Admins only")
     return user
     
 
+def revoke_token(token: str, db: Session):
+    payload = decode_token(token)
+    if not payload.get("jti"):
+        raise HTTPException(status_code=400, detail="Token cannot be revoked")
+    db.add(RevokedToken(
+        mail=payload.get("sub"),
+        jti=payload["jti"],
+        expires_at=datetime.utcfromtimestamp(payload["exp"])
+    ))
+    db.commit()
+    _refresh_revocations(db, force=True)
+    return {"message": "Logged out"}
+
+
+def revoke_user_tokens(mail: str, db: Session):
+    # Every token issued to this user so far stops working
+    db.add(RevokedToken(
+        mail=mail,
+        expires_at=datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    ))
+    db.commit()
+    invalidate_user(mail)
+    _refresh_revocations(db, force=True)
+
+
+def update_user_role(mail: str, role: str, db: Session):
+    user = db.query(User).filter(User.mail == mail).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    user.role = role
+    db.commit()
+    revoke_user_tokens(mail, db)
+    return {"message": f"Role of '{mail}' set to '{role}'"}
+
+
+def delete_user(mail: str, db: Session):
+    deleted = db.query(User).filter(User.mail == mail).delete()
+    if not deleted:
+        raise HTTPException(status_code=404, detail="User not found")
+    db.commit()
+    revoke_user_tokens(mail, db)
+    return {"message": f"User '{mail}' deleted"}
+
 
 # Registration Logic
 def register_user(data, db: Session):
@@ -51,7 +188,8 @@ def register_user(data, db: Session):
         raise HTTPException(status_code=400, detail="User already exists")
 
     # Hash the password before storing it
-    hashed_password = get_password_hash(data.password)
+    with hashing_slot("register"):
+        hashed_password = get_password_hash(data.password)
 
     # Create the new user object
     new_user = User(
@@ -72,9 +210,19 @@ def register_user(data, db: Session):
 # Login Logic
 def login_user(form_data, db: Session):
     user = db.query(User).filter(User.mail == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
+    with hashing_slot("login"):
+        verified, new_hash = verify_and_update(form_data.password, user.hashed_password)
+    if not verified:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+
+    # Hashing parameters changed since this password was stored: upgrade it
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+
     token_data = {
         "sub": user.mail,
         "role": user.role,
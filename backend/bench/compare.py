@@ -0,0 +1,66 @@
+# Compare two bench/run.py reports.
+#
+#   python bench/compare.py baseline.json candidate.json [--threshold 10]
+#
+# Prints the change of every metric per scenario and exits with status 1
+# when a latency percentile got slower, or throughput dropped, by more than
+# --threshold percent.
+import argparse
+import json
+import sys
+
+# metric -> True when a higher value is better
+METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "throughput_rps": True,
+    "peak_rss_mb": False,
+}
+GATED = {"p95_ms", "p99_ms", "throughput_rps"}
+
+
+def _change(before, after):
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(baseline: dict, candidate: dict, threshold: float):
+    regressions = []
+    for name, new in candidate["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if not old:
+            print(f"{name}: not in baseline")
+            continue
+        print(name)
+        for metric, higher_is_better in METRICS.items():
+            change = _change(old.get(metric), new.get(metric))
+            if change is None:
+                continue
+            worse = -change if higher_is_better else change
+            flag = ""
+            if metric in GATED and worse > threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{name}.{metric}")
+            print(f"  {metric:<15} {old[metric]:>10} -> {new[metric]:>10}  ({change:+.1f}%){flag}")
+        if new.get("errors"):
+            print(f"  errors: {new['errors']} ({new.get('first_error')})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    regressions = compare(baseline, candidate, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
@@ -0,0 +1,125 @@
+# Deterministic synthetic asset inventory for the benchmarks.
+#
+# The same (seed, categories, rows) always produces the same categories,
+# identifiers and column values, so two benchmark runs work on identical
+# data. Categories are created through asset.create_category and filled
+# through asset.add_assets_bulk, i.e. the same code paths as the API.
+import io
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+CATEGORY_NAMES = [
+    "laptop", "desktop", "monitor", "mobile_phone", "printer",
+    "router", "tablet", "server", "projector", "scanner",
+]
+MODELS = {
+    "laptop": ["Latitude 5440", "ThinkPad T14", "EliteBook 840", "MacBook Air M2"],
+    "desktop": ["OptiPlex 7010", "ThinkCentre M70q", "ProDesk 400"],
+    "monitor": ["P2422H", "ThinkVision T24", "E24 G5"],
+    "mobile_phone": ["Galaxy A54", "iPhone 13", "Pixel 7a"],
+    "printer": ["LaserJet M404", "ecosys P2040", "MFC-L2710"],
+}
+STATUSES = ["Active"] * 14 + ["In Stock"] * 3 + ["Repair"] * 2 + ["Retired"]
+DEPARTMENTS = ["Finance", "HR", "IT", "Operations", "Sales", "Marketing", "Legal", "Procurement"]
+LOCATIONS = ["Chennai", "Bengaluru", "Pune", "Hyderabad", "Mumbai", "Coimbatore"]
+SECTIONS = ["A", "B", "C", "D"]
+FIRST_NAMES = ["anbu", "priya", "ravi", "meena", "arjun", "kavya", "suresh", "divya", "vijay", "lakshmi"]
+LAST_NAMES = ["kumar", "selvan", "raman", "iyer", "nair", "reddy", "shah", "das"]
+
+# Every generated category has the identifier, status and reassignment columns
+FIELDS = [
+    ("asset_tag", "string"), ("asset_code", "string"), ("asset_status", "string"),
+    ("model", "string"), ("purchase_date", "date"),
+    ("user_name", "string"), ("user_id", "string"), ("email", "string"),
+    ("department", "string"), ("location", "string"), ("section", "string"),
+    ("date_of_return", "date"), ("date_of_reassign", "date"), ("date_of_update", "date"),
+    ("remarks", "string"),
+]
+BASE_DATE = date(2021, 1, 1)
+
+
+def category_names(count: int):
+    names = CATEGORY_NAMES[:count]
+    for i in range(len(names), count):
+        names.append(f"{CATEGORY_NAMES[i % len(CATEGORY_NAMES)]}_{i // len(CATEGORY_NAMES)}")
+    return names
+
+
+def asset_tag(category: str, i: int) -> str:
+    return f"{category[:3].upper()}-{i:06d}"
+
+
+def asset_code(category: str, i: int) -> str:
+    # 7919 is coprime with 16**6, so codes are unique and look unordered
+    return f"{category[:2].upper()}{(i * 7919) % 0x1000000:06X}"
+
+
+def assignment(rnd: random.Random) -> dict:
+    first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+    number = rnd.randrange(10000)
+    return {
+        "user_name": f"{first} {last}",
+        "user_id": f"EMP{number:05d}",
+        "email": f"{first}.{last}{number}@example.com",
+        "department": rnd.choice(DEPARTMENTS),
+        "location": rnd.choice(LOCATIONS),
+        "section": rnd.choice(SECTIONS),
+    }
+
+
+def asset_row(category: str, i: int, seed: int) -> dict:
+    rnd = random.Random(f"{seed}:{category}:{i}")
+    purchased = BASE_DATE + timedelta(days=rnd.randrange(1500))
+    row = {
+        "asset_tag": asset_tag(category, i),
+        "asset_code": asset_code(category, i),
+        "asset_status": rnd.choice(STATUSES),
+        "model": rnd.choice(MODELS.get(category.rsplit("_", 1)[0], MODELS.get(category, ["Generic"]))),
+        "purchase_date": purchased.isoformat(),
+        "date_of_reassign": None,
+        "date_of_return": None,
+        "date_of_update": None,
+        "remarks": None,
+    }
+    if row["asset_status"] == "Active":
+        row.update(assignment(rnd))
+        row["date_of_reassign"] = (purchased + timedelta(days=rnd.randrange(1, 300))).isoformat()
+    else:
+        row.update({key: None for key in ("user_name", "user_id", "email", "department", "location", "section")})
+        if row["asset_status"] == "Repair":
+            row["remarks"] = rnd.choice(["battery swelling", "screen flicker", "keyboard fault", "no power"])
+    return row
+
+
+def build_inventory(db, categories: int, rows: int, seed: int) -> dict:
+    # Creates the categories and returns {category: row count}
+    from asset import add_assets_bulk, create_category
+    from schemas import CategoryCreate, FieldDefinition
+
+    built = {}
+    for name in category_names(categories):
+        create_category(CategoryCreate(
+            category_name=name,
+            fields=[FieldDefinition(name=field, type=kind) for field, kind in FIELDS],
+        ), db)
+        result = add_assets_bulk(name, [asset_row(name, i, seed) for i in range(rows)], db)
+        built[name] = result["inserted"]
+    return built
+
+
+def excel_workbook(sheet_name: str, rows: int, seed: int, start: int = 0) -> bytes:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_name[:31])
+    sheet.append([field for field, _ in FIELDS])
+    for i in range(start, start + rows):
+        row = asset_row(sheet_name, i, seed)
+        sheet.append([row[field] for field, _ in FIELDS])
+    out = io.BytesIO()
+    workbook.save(out)
+    return out.getvalue()
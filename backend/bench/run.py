@@ -0,0 +1,226 @@
+# Scripted API benchmark over a synthetic inventory.
+#
+#   python bench/run.py [--categories 5] [--rows 2000] [--iterations 200]
+#                       [--concurrency 8] [--seed 42] [--out bench/results.json]
+#                       [--scenarios search_asset,dashboard_stats]
+#
+# A fresh SQLite database is built with bench/generator.py (unless
+# --database-url points somewhere else), then every scenario sends its
+# requests to the app in-process through httpx's ASGI transport, so the
+# numbers cover routing, auth, validation and the database but not the
+# network. Per scenario the JSON report has p50/p95/p99/mean latency,
+# throughput, error count and the process' peak RSS (a high-water mark, so
+# it only ever grows across scenarios). Compare two reports with
+# bench/compare.py.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+from generator import asset_code, asset_row, asset_tag, assignment, build_inventory, category_names, excel_workbook  # noqa: E402
+
+HEAVY_SCENARIOS = {"upload_excel", "download_table"}
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _scenarios(args, inventory):
+    # name -> (iterations, request factory); factories return (method, url, kwargs)
+    names = list(inventory)
+    rnd = random.Random(args.seed)
+
+    def search_asset(i):
+        table = rnd.choice(names)
+        n = rnd.randrange(inventory[table])
+        identifier = asset_tag(table, n) if i % 2 else asset_code(table, n)
+        return "GET", "/search-asset", {"params": {"table_name": table, "identifier": identifier}}
+
+    def add_asset(i):
+        table = names[i % len(names)]
+        row = {k: v for k, v in asset_row(table, args.rows + i, args.seed).items() if v is not None}
+        return "POST", "/add-asset", {"json": {"table_name": table, "data": row}}
+
+    def reassign_asset(i):
+        table = rnd.choice(names)
+        payload = assignment(rnd)
+        payload.update(table_name=table, identifier=asset_tag(table, rnd.randrange(inventory[table])),
+                       date_of_reassign="2025-06-01")
+        return "PUT", "/reassign-asset", {"json": payload}
+
+    def dashboard_stats(i):
+        return "GET", "/dashboard-stats", {}
+
+    workbooks = {}
+
+    def upload_excel(i):
+        # Built ahead of the timed request; every upload is a new sheet/table
+        body = workbooks.pop(i, None) or excel_workbook(f"bench_upload_{i}", args.upload_rows, args.seed)
+        return "POST", "/upload-excel", {"files": {"file": (f"bench_{i}.xlsx", body)}}
+
+    def download_table(i):
+        fmt = "csv" if i % 2 else "xlsx"
+        return "GET", "/download-table", {"params": {"table_name": names[i % len(names)], "format": fmt}}
+
+    heavy = args.heavy_iterations
+    for i in range(heavy):
+        workbooks[i] = excel_workbook(f"bench_upload_{i}", args.upload_rows, args.seed)
+    return {
+        "search_asset": (args.iterations, search_asset),
+        "add_asset": (args.iterations, add_asset),
+        "reassign_asset": (args.iterations, reassign_asset),
+        "dashboard_stats": (args.iterations, dashboard_stats),
+        "upload_excel": (heavy, upload_excel),
+        "download_table": (heavy, download_table),
+    }
+
+
+async def _run_scenario(client, headers, iterations, make_request, concurrency):
+    from excel import peak_rss_mb
+
+    pending = iter(range(iterations))
+    latencies, errors = [], []
+
+    async def worker():
+        for i in pending:
+            method, url, kwargs = make_request(i)
+            started = time.perf_counter()
+            response = await client.request(method, url, headers=headers, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors.append(f"{response.status_code} {response.text[:200]}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "concurrency": concurrency,
+        "seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else None,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def _run(args, inventory, selected):
+    import httpx
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await client.post("/register", json={
+            "username": "bench", "mail": "bench@example.com", "password": "bench", "role": "admin",
+        })
+        login = await client.post("/login", data={"username": "bench@example.com", "password": "bench"})
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        results = {}
+        for name, (iterations, make_request) in _scenarios(args, inventory).items():
+            if name not in selected or not iterations:
+                continue
+            concurrency = 1 if name in HEAVY_SCENARIOS else args.concurrency
+            results[name] = await _run_scenario(client, headers, iterations, make_request, concurrency)
+            print(f"{name}: {json.dumps(results[name])}", file=sys.stderr)
+        return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asset API benchmark")
+    parser.add_argument("--categories", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=2000, help="rows per category")
+    parser.add_argument("--iterations", type=int, default=200, help="requests per light scenario")
+    parser.add_argument("--heavy-iterations", type=int, default=4, help="requests per upload/download scenario")
+    parser.add_argument("--upload-rows", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenarios", default="search_asset,add_asset,reassign_asset,dashboard_stats,upload_excel,download_table")
+    parser.add_argument("--database-url", help="use this database instead of a fresh temporary SQLite file")
+    parser.add_argument("--out", default=os.path.join(BENCH_DIR, "results.json"))
+    args = parser.parse_args()
+
+    db_path = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        fd, db_path = tempfile.mkstemp(suffix=".db", prefix="asset-bench-")
+        os.close(fd)
+        os.remove(db_path)
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    # Imported only now so the app binds to the bench database
+    import sqlalchemy
+    from models import SessionLocal, engine
+
+    try:
+        started = time.perf_counter()
+        session = SessionLocal()
+        try:
+            inventory = build_inventory(session, args.categories, args.rows, args.seed)
+        finally:
+            session.close()
+        generate_seconds = round(time.perf_counter() - started, 3)
+        print(f"generated {sum(inventory.values())} assets in {generate_seconds}s", file=sys.stderr)
+
+        selected = {s.strip() for s in args.scenarios.split(",") if s.strip()}
+        results = asyncio.run(_run(args, inventory, selected))
+
+        report = {
+            "meta": {
+                "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "sqlalchemy": sqlalchemy.__version__,
+                "database": engine.dialect.name,
+                "platform": platform.platform(),
+                "seed": args.seed,
+                "categories": category_names(args.categories),
+                "rows_per_category": args.rows,
+                "iterations": args.iterations,
+                "heavy_iterations": args.heavy_iterations,
+                "upload_rows": args.upload_rows,
+                "concurrency": args.concurrency,
+                "generate_seconds": generate_seconds,
+            },
+            "scenarios": results,
+        }
+        with open(args.out, "w") as out:
+            json.dump(report, out, indent=2)
+        print(f"wrote {args.out}", file=sys.stderr)
+    finally:
+        engine.dispose()
+        if db_path:
+            for suffix in ("", "-wal", "-shm", "-journal"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# Read-during-write throughput with and without the SQLite tuning profile.
+#
+#   python bench/sqlite_profile.py [--rows 50000] [--seconds 5] [--readers 4]
+#
+# Each run uses a fresh database file: one thread inserts and commits single
+# rows (the add_asset pattern) while reader threads do point lookups by
+# asset_tag and an occasional asset_status count (the dashboard pattern).
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import text  # noqa: E402
+
+from models import build_engine, sqlite_settings_report  # noqa: E402
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(tuned: bool, rows: int, seconds: float, readers: int) -> dict:
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = build_engine(f"sqlite:///{path}", sqlite_tuning=tuned)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                'CREATE TABLE laptop (asset_tag VARCHAR PRIMARY KEY, asset_status VARCHAR, user_name VARCHAR)'
+            ))
+            conn.execute(
+                text("INSERT INTO laptop VALUES (:tag, :status, :user)"),
+                [{"tag": f"L{i:07d}", "status": "Active" if i % 3 else "Retired", "user": f"user{i % 500}"}
+                 for i in range(rows)],
+            )
+
+        stop = threading.Event()
+        writes = [0]
+        read_latencies = [[] for _ in range(readers)]
+
+        def writer():
+            i = rows
+            while not stop.is_set():
+                with engine.begin() as conn:
+                    conn.execute(text("INSERT INTO laptop VALUES (:tag, 'Active', 'bench')"), {"tag": f"L{i:07d}"})
+                writes[0] += 1
+                i += 1
+
+        def reader(slot):
+            rnd = random.Random(slot)
+            n = 0
+            while not stop.is_set():
+                started = time.perf_counter()
+                with engine.connect() as conn:
+                    if n % 50 == 0:
+                        conn.execute(text("SELECT COUNT(*) FROM laptop WHERE asset_status = 'Active'")).scalar()
+                    else:
+                        conn.execute(
+                            text("SELECT * FROM laptop WHERE asset_tag = :tag"), {"tag": f"L{rnd.randrange(rows):07d}"}
+                        ).fetchall()
+                read_latencies[slot].append(time.perf_counter() - started)
+                n += 1
+
+        threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+
+        latencies = [lat for slot in read_latencies for lat in slot]
+        return {
+            "profile": "tuned" if tuned else "defaults",
+            "settings": sqlite_settings_report(engine),
+            "writes_per_sec": round(writes[0] / seconds, 1),
+            "reads_per_sec": round(len(latencies) / seconds, 1),
+            "read_p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+            "read_p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        }
+    finally:
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    results = [run(tuned, args.rows, args.seconds, args.readers) for tuned in (False, True)]
+    print(json.dumps(results, indent=2))
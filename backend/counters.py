@@ -0,0 +1,107 @@
+import sys
+from collections import Counter
+from typing import Dict, Iterable
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from models import AssetCounter, SessionLocal
+from schema_registry import get_all_table_schemas
+from statements import count_rows
+
+# Asset totals per category and asset_status, kept in asset_counters by the
+# write paths in asset.py/main.py so the dashboard never has to COUNT(*) the
+# category tables. reconcile_counters() recomputes everything from the tables
+# and reports any drift it corrected.
+
+
+def status_deltas(rows: Iterable[Dict], sign: int = 1) -> Dict[str, int]:
+    counts = Counter(str(row.get("asset_status") or "") for row in rows)
+    return {status: sign * n for status, n in counts.items()}
+
+
+def bump_counters(conn, table_name: str, deltas: Dict[str, int]):
+    # conn is the Session or Connection of the write being counted
+    for status, delta in deltas.items():
+        if not delta:
+            continue
+        params = {"category": table_name, "status": status, "delta": delta}
+        result = conn.execute(text(
+            "UPDATE asset_counters SET count = count + :delta "
+            "WHERE category = :category AND asset_status = :status"
+        ), params)
+        if result.rowcount == 0:
+            conn.execute(text(
+                "INSERT INTO asset_counters (category, asset_status, count) VALUES (:category, :status, :delta)"
+            ), params)
+
+
+def remove_category_counters(conn, table_name: str):
+    conn.execute(text("DELETE FROM asset_counters WHERE category = :category"), {"category": table_name})
+
+
+def recount_category(conn, table_name: str, schema: dict) -> Dict[str, int]:
+    if "asset_status" in schema["columns"]:
+        rows = conn.execute(count_rows(schema, "asset_status")).fetchall()
+        counts = Counter()
+        for r in rows:
+            counts[str(r.value)] += r.n
+    else:
+        counts = {"": conn.execute(count_rows(schema)).scalar()}
+
+    remove_category_counters(conn, table_name)
+    for status, n in counts.items():
+        if n:
+            conn.execute(text(
+                "INSERT INTO asset_counters (category, asset_status, count) VALUES (:category, :status, :n)"
+            ), {"category": table_name, "status": status, "n": n})
+    return dict(counts)
+
+
+def read_counters(db: Session) -> Dict[str, Dict[str, int]]:
+    # {category: {asset_status: count}} in a single query
+    counts: Dict[str, Dict[str, int]] = {}
+    for category, status, n in db.query(AssetCounter.category, AssetCounter.asset_status, AssetCounter.count):
+        counts.setdefault(category, {})[status] = n
+    return counts
+
+
+def reconcile_counters(db: Session):
+    before = read_counters(db)
+    schemas = get_all_table_schemas(db)
+    drift = {}
+    for table_name, schema in schemas.items():
+        after = {k: v for k, v in recount_category(db, table_name, schema).items() if v}
+        old = {k: v for k, v in before.get(table_name, {}).items() if v}
+        if after != old:
+            drift[table_name] = {"before": old, "after": after}
+
+    # Counters left behind by categories that no longer exist
+    for table_name in set(before) - set(schemas):
+        remove_category_counters(db, table_name)
+        drift[table_name] = {"before": before[table_name], "after": {}}
+
+    db.commit()
+    return {"message": "Asset counters reconciled", "categories": len(schemas), "drift": drift}
+
+
+def seed_counters_if_empty():
+    # First start after the counters table was added: build it once
+    db = SessionLocal()
+    try:
+        if db.query(AssetCounter).first() is None and get_all_table_schemas(db):
+            print(reconcile_counters(db)["message"])
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    # python counters.py reconcile
+    if sys.argv[1:] != ["reconcile"]:
+        print("usage: python counters.py reconcile")
+        sys.exit(1)
+    session = SessionLocal()
+    try:
+        print(reconcile_counters(session))
+    finally:
+        session.close()
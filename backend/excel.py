@@ -1,13 +1,28 @@
+from datetime import datetime
+import os
+from typing import Dict, Tuple
 import pandas as pd
 from fastapi import UploadFile
+from openpyxl import load_workbook
 from pytest import Session
-from sqlalchemy import Engine, Table, Column, String, MetaData, text
+from sqlalchemy import Boolean, Date, Engine, Float, Integer, Table, Column, String, MetaData, text
 from fastapi import HTTPException
 
 from models import Base, CategoryInfo
 
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
 metadata = Base.metadata
 
+# Number of non-null values per column used to infer its SQL type on import;
+# 0 means the whole column is inspected.
+TYPE_INFERENCE_SAMPLE_SIZE = int(os.getenv("EXCEL_TYPE_SAMPLE_SIZE", "0"))
+# Largest value an Integer column stores
+INT64_MAX = 2 ** 63 - 1
+
 def create_tables_from_excel(file: UploadFile, db: Session):
     try:
         # Read all sheets
@@ -50,4 +65,114 @@ def create_tables_from_excel(file: UploadFile, db: Session):
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing Excel file: {str(e)}")
-    
\ No newline at end of file
+    
+
+
+def iter_sheet_chunks(fileobj, chunk_size: int):
+    # Yields (sheet_name, header, chunks) per worksheet, where chunks is a
+    # generator of row-tuple lists of at most chunk_size. The workbook is opened
+    # read-only so openpyxl streams rows from the archive instead of building
+    # the whole sheet in memory. Blank rows are skipped.
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header or all(cell is None for cell in header):
+                continue
+            header = [
+                str(cell) if cell is not None else f"unnamed_{i}"
+                for i, cell in enumerate(header)
+            ]
+
+            def chunks(rows=rows, width=len(header)):
+                chunk = []
+                for row in rows:
+                    if all(cell is None for cell in row):
+                        continue
+                    row = tuple(row[:width]) + (None,) * (width - len(row))
+                    chunk.append(row)
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+                if chunk:
+                    yield chunk
+
+            yield sheet.title, header, chunks()
+    finally:
+        workbook.close()
+
+
+def peak_rss_mb():
+    # Process-wide high-water mark of resident memory, None where unsupported
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def infer_column_type(series: pd.Series, sample_size: int = TYPE_INFERENCE_SAMPLE_SIZE):
+    values = series.dropna()
+    if sample_size:
+        values = values.iloc[:sample_size]
+    if values.empty:
+        return String
+
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if kind == "boolean":
+        return Boolean
+    if kind == "integer":
+        return Integer
+    if kind in ("floating", "mixed-integer-float", "decimal"):
+        # Excel has no integer cells, and blanks turn int columns into floats
+        numbers = pd.to_numeric(values, errors="coerce")
+        return Integer if (numbers % 1 == 0).all() else Float
+    if kind in ("datetime64", "datetime", "date"):
+        return Date
+    return String
+
+
+def coerce_column(series: pd.Series, dtype) -> Tuple[list, list]:
+    # Convert a whole column to plain Python values for its SQL type in one
+    # pass. Values that cannot be converted become None; their positions are
+    # returned alongside so the caller can refuse or widen the column rather
+    # than lose them.
+    present = series.notna()
+    if dtype is Integer:
+        # Only whole numbers within a 64-bit integer fit; anything else is
+        # reported as lost rather than rounded or overflowed
+        numbers = pd.to_numeric(series, errors="coerce")
+        if numbers.dtype.kind == "i":
+            fits = numbers.notna()
+        elif numbers.dtype.kind == "u":
+            fits = numbers <= INT64_MAX
+        else:
+            fits = (numbers % 1 == 0) & (numbers >= -2 ** 63) & (numbers < 2 ** 63)
+        converted = pd.Series(pd.NA, index=series.index, dtype="Int64")
+        converted[fits] = numbers[fits].astype("int64")
+    elif dtype is Float:
+        converted = pd.to_numeric(series, errors="coerce")
+    elif dtype is Boolean:
+        try:
+            converted = series.astype("boolean")
+        except (TypeError, ValueError):
+            converted = series.where(series.isin([True, False])).astype("boolean")
+    elif dtype is Date:
+        converted = pd.to_datetime(series, errors="coerce").dt.date
+    else:
+        converted = pd.Series(None, index=series.index, dtype=object)
+        converted[present] = series[present].astype(str)
+    converted = converted.astype(object)
+    lost = (present & converted.isna()).to_numpy().nonzero()[0].tolist()
+    return converted.where(converted.notna(), None).tolist(), lost
+
+
+def frame_to_records(df: pd.DataFrame, column_names: list, dtypes: list) -> Tuple[list, Dict[str, list]]:
+    # Typed row dicts ready for an executemany insert, and per column the
+    # positions of values that did not fit its type
+    columns, lost = [], {}
+    for name, col, dtype in zip(column_names, df.columns, dtypes):
+        values, positions = coerce_column(df[col], dtype)
+        columns.append(values)
+        if positions:
+            lost[name] = positions
+    return [dict(zip(column_names, row)) for row in zip(*columns)], lost
@@ -0,0 +1,159 @@
+import csv
+import io
+import multiprocessing
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from openpyxl import Workbook
+from sqlalchemy import text
+
+from models import engine
+
+# Table exports that never hold a whole table in memory. Rows are read through
+# a server-side cursor in chunks of EXPORT_CHUNK_SIZE; CSV is yielded chunk by
+# chunk, XLSX is written by openpyxl's write-only workbook (rows go straight
+# to a temp file) and then streamed from disk. XLSX is therefore buffered, not
+# streamed: nothing is sent until the workbook is complete.
+
+EXPORT_CHUNK_SIZE = 1000
+STREAM_BLOCK_SIZE = 64 * 1024
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MEDIA_TYPE = "text/csv"
+ZIP_MEDIA_TYPE = "application/zip"
+
+# Worker processes used by the multi-table ZIP export
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+_export_pool = None
+
+
+def iter_table_partitions(table_name: str, chunk_size: int = EXPORT_CHUNK_SIZE):
+    # Yields the column names first, then lists of row tuples
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(
+            text(f'SELECT * FROM "{table_name}"')
+        )
+        yield list(result.keys())
+        for rows in result.partitions():
+            yield rows
+
+
+def iter_csv(table_name: str):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for chunk in iter_table_partitions(table_name):
+        if chunk and isinstance(chunk[0], str):
+            writer.writerow(chunk)
+        else:
+            writer.writerows(chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def write_csv(table_name: str, fileobj):
+    for block in iter_csv(table_name):
+        fileobj.write(block)
+
+
+def write_xlsx(table_name: str, fileobj):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=table_name[:31])
+    partitions = iter_table_partitions(table_name)
+    sheet.append(next(partitions))
+    for rows in partitions:
+        for row in rows:
+            sheet.append(list(row))
+    workbook.save(fileobj)
+
+
+def iter_xlsx(table_name: str):
+    with tempfile.TemporaryFile() as tmp:
+        write_xlsx(table_name, tmp)
+        tmp.seek(0)
+        while True:
+            block = tmp.read(STREAM_BLOCK_SIZE)
+            if not block:
+                break
+            yield block
+
+
+def export_to_file(table_name: str, format: str) -> str:
+    # Runs in a worker process: writes one table to a temp file, returns its path
+    fd, path = tempfile.mkstemp(suffix=f".{format}")
+    with os.fdopen(fd, "wb") as out:
+        if format == "csv":
+            write_csv(table_name, out)
+        else:
+            write_xlsx(table_name, out)
+    return path
+
+
+def _get_export_pool():
+    global _export_pool
+    if _export_pool is None:
+        # spawn keeps workers clear of the server's threads and open connections
+        _export_pool = ProcessPoolExecutor(
+            max_workers=EXPORT_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _export_pool
+
+
+class _ZipStream:
+    # Write-only, unseekable sink for zipfile; the bytes written so far are
+    # collected with drain() and handed to the response
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _discard_export(future):
+    if not future.cancelled() and future.exception() is None:
+        try:
+            os.remove(future.result())
+        except OSError:
+            pass
+
+
+def iter_zip(table_names, format: str = "xlsx"):
+    # Tables are exported concurrently by the worker pool; each finished file
+    # is copied into the archive and sent on, in completion order
+    futures = {_get_export_pool().submit(export_to_file, name, format): name for name in table_names}
+    pending = set(futures)
+    sink = _ZipStream()
+    try:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for future in as_completed(futures):
+                pending.discard(future)
+                path = future.result()
+                try:
+                    with open(path, "rb") as src, archive.open(f"{futures[future]}.{format}", "w", force_zip64=True) as entry:
+                        while True:
+                            block = src.read(STREAM_BLOCK_SIZE)
+                            if not block:
+                                break
+                            entry.write(block)
+                            data = sink.drain()
+                            if data:
+                                yield data
+                finally:
+                    os.remove(path)
+        yield sink.drain()
+    finally:
+        # Client went away or an export failed: drop the remaining work
+        for future in pending:
+            if not future.cancel():
+                future.add_done_callback(_discard_export)
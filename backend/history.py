@@ -0,0 +1,182 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, insert, or_
+from sqlalchemy.orm import Session
+
+from models import AssetHistory, AssetLookup
+from schema_registry import get_table_schema
+from statements import select_all, select_by
+
+# Append-only log of every change to a category row. Each entry holds only
+# what changed: the full row for an insert, the changed columns' new and
+# previous values for an update, and the last full row for a delete. Entries
+# are written in the caller's transaction and never updated or deleted.
+# The state of a category at time T is the current table with every entry
+# after T undone (newest first), so no snapshots are needed and assets that
+# predate the log are covered too.
+
+HISTORY_PAGE_MAX = 1000
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _row_identifier(row: Dict, schema: dict) -> Optional[str]:
+    for col in schema["identifier_columns"]:
+        if row.get(col) not in (None, ""):
+            return str(row[col])
+    return None
+
+
+def _write(conn, entries: List[Dict]):
+    if entries:
+        conn.execute(insert(AssetHistory.__table__), entries)
+
+
+def _entry(table_name: str, identifier: str, action: str, changes=None, previous=None, now=None) -> Dict:
+    return {
+        "category": table_name,
+        "identifier": identifier,
+        "action": action,
+        "changes": changes,
+        "previous": previous,
+        "changed_at": now or datetime.utcnow(),
+    }
+
+
+def record_inserts(conn, table_name: str, schema: dict, rows: Iterable[Dict]):
+    # conn is the Session or Connection of the write being logged
+    if not schema or not schema["identifier_columns"]:
+        return
+    now = datetime.utcnow()
+    entries = []
+    for row in rows:
+        identifier = _row_identifier(row, schema)
+        if identifier is not None:
+            values = {k: _jsonable(v) for k, v in row.items() if v is not None}
+            entries.append(_entry(table_name, identifier, "insert", changes=values, now=now))
+    _write(conn, entries)
+
+
+def record_updates(conn, table_name: str, schema: dict, updates: Iterable[Tuple[Dict, Dict]]):
+    # updates are (row before the change, {column: new value}) pairs; columns
+    # whose value did not actually change are left out
+    now = datetime.utcnow()
+    entries = []
+    for before, fields in updates:
+        identifier = _row_identifier(before, schema)
+        changed = {
+            col: _jsonable(value) for col, value in fields.items()
+            if _jsonable(value) != _jsonable(before.get(col))
+        }
+        if identifier is not None and changed:
+            previous = {col: _jsonable(before.get(col)) for col in changed}
+            entries.append(_entry(table_name, identifier, "update", changes=changed, previous=previous, now=now))
+    _write(conn, entries)
+
+
+def record_deletes(conn, table_name: str, schema: dict, rows: Iterable[Dict]):
+    now = datetime.utcnow()
+    entries = []
+    for row in rows:
+        identifier = _row_identifier(row, schema)
+        if identifier is not None:
+            previous = {k: _jsonable(v) for k, v in row.items() if v is not None}
+            entries.append(_entry(table_name, identifier, "delete", previous=previous, now=now))
+    _write(conn, entries)
+
+
+def _serialize(entry: AssetHistory) -> Dict:
+    return {
+        "id": entry.id,
+        "category": entry.category,
+        "identifier": entry.identifier,
+        "action": entry.action,
+        "changes": entry.changes,
+        "previous": entry.previous,
+        "changed_at": entry.changed_at,
+    }
+
+
+def _entry_keys(identifier: str, db: Session, table_name: Optional[str] = None) -> List[Tuple[str, str]]:
+    # Entries are keyed by the row's first identifier (asset_tag before
+    # asset_code); map whichever one the caller has to that key through the
+    # current rows of the categories holding it
+    if table_name:
+        categories = [table_name]
+    else:
+        categories = [r.category for r in db.query(AssetLookup).filter(AssetLookup.identifier == identifier)]
+    keys = []
+    for category in categories:
+        schema = get_table_schema(category, db)
+        if not schema or not schema["identifier_columns"]:
+            continue
+        for row in db.execute(select_by(schema, schema["identifier_columns"]), {"identifier": identifier}):
+            key = _row_identifier(dict(row._mapping), schema)
+            if key is not None and key != identifier:
+                keys.append((category, key))
+    return keys
+
+
+def asset_history(identifier: str, db: Session, table_name: Optional[str] = None, limit: int = 100):
+    matches = [AssetHistory.identifier == identifier] + [
+        and_(AssetHistory.category == category, AssetHistory.identifier == key)
+        for category, key in _entry_keys(identifier, db, table_name)
+    ]
+    query = db.query(AssetHistory).filter(or_(*matches))
+    if table_name:
+        query = query.filter(AssetHistory.category == table_name)
+    entries = query.order_by(AssetHistory.id).limit(min(limit, HISTORY_PAGE_MAX)).all()
+    if not entries:
+        raise HTTPException(status_code=404, detail="No history for the given identifier")
+    return {"identifier": identifier, "count": len(entries), "history": [_serialize(e) for e in entries]}
+
+
+def category_as_of(table_name: str, as_of: datetime, db: Session):
+    schema = get_table_schema(table_name, db)
+    if not schema:
+        raise HTTPException(status_code=404, detail="Table not found")
+    if not schema["identifier_columns"]:
+        raise HTTPException(status_code=400, detail="No identifier field (asset tag/code) found")
+
+    state: Dict[str, Dict] = {}
+    for row in db.execute(select_all(schema)):
+        row = {k: _jsonable(v) for k, v in row._mapping.items()}
+        identifier = _row_identifier(row, schema)
+        if identifier is not None:
+            state[identifier] = row
+
+    # Undo everything logged after as_of, newest first
+    later = (
+        db.query(AssetHistory)
+        .filter(AssetHistory.category == table_name, AssetHistory.changed_at > as_of)
+        .order_by(AssetHistory.id.desc())
+        .yield_per(HISTORY_PAGE_MAX)
+    )
+    undone = 0
+    for entry in later:
+        undone += 1
+        if entry.action == "insert":
+            state.pop(entry.identifier, None)
+        elif entry.action == "delete":
+            state[entry.identifier] = {col: None for col in schema["columns"]} | (entry.previous or {})
+        elif entry.identifier in state:
+            state[entry.identifier].update(entry.previous or {})
+
+    return {
+        "table": table_name,
+        "as_of": as_of,
+        "changes_undone": undone,
+        "count": len(state),
+        "assets": list(state.values()),
+    }
@@ -0,0 +1,126 @@
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import Column, Index, MetaData, Table, text
+from sqlalchemy.orm import Session
+
+from models import SessionLocal, engine
+from schema_registry import get_all_table_schemas, get_table_schema, invalidate_table_schema
+
+# Secondary indexes on the category tables. Fields declared with
+# indexed=True get one, and so do the identifier and status columns every
+# lookup, reassignment and counter recount filters on. Names follow
+# SQLAlchemy's index=True convention (ix_<table>_<column>) so indexes created
+# with the table and those added later look the same.
+
+AUTO_INDEXED_COLUMNS = ["asset_tag", "asset_code", "asset_status"]
+
+
+def index_name(table_name: str, column: str) -> str:
+    return f"ix_{table_name}_{column}"
+
+
+def wants_index(column: str, declared: bool = False, primary_key: Optional[str] = None) -> bool:
+    return column != primary_key and (declared or column in AUTO_INDEXED_COLUMNS)
+
+
+def create_field_indexes(conn, table_name: str, columns: Iterable[str]):
+    # conn is the Connection running the matching DDL; existing indexes are kept
+    for column in columns:
+        table = Table(table_name, MetaData(), Column(column))
+        Index(index_name(table_name, column), table.c[column]).create(bind=conn, checkfirst=True)
+
+
+def drop_column_indexes(conn, schema: dict, column: str) -> List[str]:
+    # Every index covering the column has to go before the column itself can
+    dropped = [name for name, cols in schema["indexes"].items() if column in cols]
+    for name in dropped:
+        conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+    return dropped
+
+
+def _sqlite_usage(db: Session, table_name: str, columns: List[str]) -> Dict:
+    # Which index the planner picks for an equality lookup on the leading column
+    plan = db.execute(
+        text(f'EXPLAIN QUERY PLAN SELECT * FROM "{table_name}" WHERE "{columns[0]}" = :value'),
+        {"value": None},
+    ).fetchall()
+    detail = "; ".join(str(row[-1]) for row in plan)
+    return {"lookup_plan": detail}
+
+
+def _postgres_usage(db: Session, table_name: str) -> Dict[str, Dict]:
+    rows = db.execute(
+        text("SELECT indexrelname, idx_scan, idx_tup_read FROM pg_stat_user_indexes WHERE relname = :table"),
+        {"table": table_name},
+    ).fetchall()
+    return {r.indexrelname: {"scans": r.idx_scan, "tuples_read": r.idx_tup_read} for r in rows}
+
+
+def index_report(db: Session, table_name: Optional[str] = None):
+    if table_name:
+        schema = get_table_schema(table_name, db)
+        if not schema:
+            raise HTTPException(status_code=404, detail="Table not found")
+        schemas = {table_name: schema}
+    else:
+        schemas = get_all_table_schemas(db)
+
+    dialect = db.get_bind().dialect.name
+    report = {}
+    for name, schema in schemas.items():
+        stats = _postgres_usage(db, name) if dialect == "postgresql" else {}
+        indexes = []
+        for index, columns in schema["indexes"].items():
+            entry = {"name": index, "columns": columns}
+            if dialect == "sqlite":
+                entry.update(_sqlite_usage(db, name, columns))
+                entry["used_for_lookup"] = f"INDEX {index}" in entry["lookup_plan"]
+            elif index in stats:
+                entry.update(stats[index])
+            indexes.append(entry)
+
+        indexed_columns = {cols[0] for cols in schema["indexes"].values()}
+        declared = [f["name"] for f in schema["fields"] if f.get("indexed")]
+        report[name] = {
+            "primary_key": schema["primary_key"],
+            "indexes": indexes,
+            "declared": declared,
+            "missing": [
+                c for c in declared
+                if c in schema["columns"] and c != schema["primary_key"] and c not in indexed_columns
+            ],
+        }
+    return report
+
+
+def sync_indexes(db: Session):
+    # Backfill the indexes that tables created before indexing was managed
+    # here (or declared after the fact) are missing
+    created = {}
+    for name, schema in get_all_table_schemas(db).items():
+        declared = {f["name"] for f in schema["fields"] if f.get("indexed")}
+        indexed_columns = {cols[0] for cols in schema["indexes"].values()}
+        missing = [
+            c for c in schema["columns"]
+            if c not in indexed_columns and wants_index(c, c in declared, schema["primary_key"])
+        ]
+        if missing:
+            with engine.begin() as conn:
+                create_field_indexes(conn, name, missing)
+            invalidate_table_schema(name)
+            created[name] = [index_name(name, c) for c in missing]
+    return {"message": "Indexes in sync", "created": created}
+
+
+if __name__ == "__main__":
+    # python indexes.py sync
+    if sys.argv[1:] != ["sync"]:
+        print("usage: python indexes.py sync")
+        sys.exit(1)
+    session = SessionLocal()
+    try:
+        print(sync_indexes(session))
+    finally:
+        session.close()
@@ -0,0 +1,151 @@
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from asset import upload_excel_streaming
+from models import ImportJob, SessionLocal
+
+# Background Excel imports. Uploads are copied to UPLOAD_DIR, recorded in the
+# import_jobs table and run by a small local thread pool; progress is written
+# to the job row in the same transaction as every chunk so it survives restarts.
+# Every worker process resumes pending jobs on startup; a job only runs in the
+# process that atomically claims it, and a running job is only taken over once
+# its progress has not moved for IMPORT_STALE_SECONDS.
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+IMPORT_STALE_SECONDS = int(os.getenv("IMPORT_STALE_SECONDS", "300"))
+
+_executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="excel-import")
+
+
+def job_to_dict(job: ImportJob) -> dict:
+    return {
+        "job_id": job.id,
+        "filename": job.filename,
+        "status": job.status,
+        "sheets_done": job.sheets_done,
+        "rows_inserted": job.rows_inserted,
+        "errors": job.errors or [],
+        "result": job.result,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+def enqueue_excel_import(file, db: Session, submitted_by: str = None):
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    job_id = uuid.uuid4().hex
+    file_path = os.path.join(UPLOAD_DIR, f"{job_id}.xlsx")
+    with open(file_path, "wb") as out:
+        shutil.copyfileobj(file.file, out)
+
+    job = ImportJob(
+        id=job_id,
+        filename=file.filename or "upload.xlsx",
+        file_path=file_path,
+        status="queued",
+        submitted_by=submitted_by,
+    )
+    db.add(job)
+    db.commit()
+
+    _executor.submit(_run_import, job_id)
+    return {"message": "Excel import queued", "job_id": job_id, "status": "queued"}
+
+
+def get_import_job(job_id: str, db: Session):
+    job = db.get(ImportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job_to_dict(job)
+
+
+def list_import_jobs(db: Session, limit: int = 50):
+    jobs = db.query(ImportJob).order_by(ImportJob.created_at.desc()).limit(limit).all()
+    return [job_to_dict(job) for job in jobs]
+
+
+def resume_import_jobs():
+    # Re-submit queued jobs, and running jobs whose process stopped. A running
+    # job another worker is still updating is left alone; queued ones may be
+    # submitted by several workers, the claim in _run_import picks one.
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        db.execute(
+            update(ImportJob)
+            .where(ImportJob.status == "running", ImportJob.updated_at < now - timedelta(seconds=IMPORT_STALE_SECONDS))
+            .values(status="queued", updated_at=now)
+        )
+        db.commit()
+        job_ids = [job_id for (job_id,) in db.query(ImportJob.id).filter(ImportJob.status == "queued")]
+    finally:
+        db.close()
+
+    for job_id in job_ids:
+        _executor.submit(_run_import, job_id)
+    if job_ids:
+        print(f"Resumed {len(job_ids)} import job(s)")
+
+
+def _run_import(job_id: str):
+    db = SessionLocal()
+    try:
+        # Claim the job; whoever moves it out of queued first runs it
+        claimed = db.execute(
+            update(ImportJob)
+            .where(ImportJob.id == job_id, ImportJob.status == "queued")
+            .values(status="running", updated_at=datetime.utcnow())
+        ).rowcount
+        db.commit()
+        if claimed != 1:
+            return
+        job = db.get(ImportJob, job_id)
+
+        resume_from = (job.sheets_done, job.sheet_rows)
+        rows_before = job.rows_inserted
+        last_sheet_rows = job.sheet_rows
+
+        def progress(conn, sheets_done, sheet_rows):
+            # Written through the chunk's own connection, so it commits (or
+            # rolls back) together with the rows it counts
+            nonlocal rows_before, last_sheet_rows
+            if sheet_rows:
+                rows_before += sheet_rows - last_sheet_rows
+            last_sheet_rows = sheet_rows
+            conn.execute(
+                update(ImportJob).where(ImportJob.id == job_id).values(
+                    sheets_done=sheets_done,
+                    sheet_rows=sheet_rows,
+                    rows_inserted=rows_before,
+                    updated_at=datetime.utcnow(),
+                )
+            )
+
+        with open(job.file_path, "rb") as fh:
+            result = upload_excel_streaming(fh, db, progress=progress, resume_from=resume_from)
+
+        job.status = "completed"
+        job.result = result
+        job.updated_at = datetime.utcnow()
+        db.commit()
+        os.remove(job.file_path)
+
+    except Exception as e:
+        db.rollback()
+        job = db.get(ImportJob, job_id)
+        if job:
+            job.status = "failed"
+            job.errors = (job.errors or []) + [getattr(e, "detail", None) or str(e)]
+            job.updated_at = datetime.utcnow()
+            db.commit()
+        print(f"Import job {job_id} failed: {e}")
+    finally:
+        db.close()
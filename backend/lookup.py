@@ -0,0 +1,111 @@
+import sys
+from typing import Dict, Iterable, List
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from models import AssetLookup, SessionLocal
+from schema_registry import get_all_table_schemas
+from statements import select_all
+
+# Global map of every asset_tag/asset_code value to the category holding it,
+# so an asset can be found without knowing its table. Kept up to date by the
+# same write paths that maintain the search index and counters, in the
+# caller's transaction; rebuild_lookup() recomputes it from the tables.
+
+REBUILD_CHUNK_SIZE = 1000
+# Keeps IN (...) lists well under SQLite's bound-parameter limit
+WRITE_CHUNK_SIZE = 500
+
+
+def asset_identifiers(row: Dict, schema: dict) -> List[str]:
+    return [str(row[col]) for col in schema["identifier_columns"] if row.get(col) not in (None, "")]
+
+
+def _delete_entries(conn, table_name: str, identifiers: List[str]):
+    for start in range(0, len(identifiers), WRITE_CHUNK_SIZE):
+        conn.execute(
+            text("DELETE FROM asset_lookup WHERE category = :category AND identifier IN :identifiers")
+            .bindparams(bindparam("identifiers", expanding=True)),
+            {"category": table_name, "identifiers": identifiers[start:start + WRITE_CHUNK_SIZE]},
+        )
+
+
+def register_assets(conn, table_name: str, schema: dict, rows: Iterable[Dict]):
+    # conn is the Session or Connection of the write being registered
+    if not schema or not schema["identifier_columns"]:
+        return
+    identifiers = list(dict.fromkeys(i for row in rows for i in asset_identifiers(row, schema)))
+    if not identifiers:
+        return
+    _delete_entries(conn, table_name, identifiers)
+    conn.execute(
+        text("INSERT INTO asset_lookup (identifier, category) VALUES (:identifier, :category)"),
+        [{"identifier": i, "category": table_name} for i in identifiers],
+    )
+
+
+def unregister_assets(conn, table_name: str, identifiers: Iterable[str]):
+    _delete_entries(conn, table_name, list(dict.fromkeys(str(i) for i in identifiers)))
+
+
+def unregister_category(conn, table_name: str):
+    conn.execute(text("DELETE FROM asset_lookup WHERE category = :category"), {"category": table_name})
+
+
+def rebuild_category_lookup(conn, table_name: str, schema: dict) -> int:
+    unregister_category(conn, table_name)
+    if not schema or not schema["identifier_columns"]:
+        return 0
+    result = conn.execute(select_all(schema, schema["identifier_columns"]))
+    total = 0
+    while True:
+        rows = result.fetchmany(REBUILD_CHUNK_SIZE)
+        if not rows:
+            break
+        register_assets(conn, table_name, schema, [dict(row._mapping) for row in rows])
+        total += len(rows)
+    return total
+
+
+def rebuild_lookup(db: Session):
+    db.execute(text("DELETE FROM asset_lookup"))
+    counts = {
+        table_name: rebuild_category_lookup(db, table_name, schema)
+        for table_name, schema in get_all_table_schemas(db).items()
+    }
+    db.commit()
+    return {"message": "Asset lookup rebuilt", "indexed": counts}
+
+
+def seed_lookup_if_empty():
+    # First start after the lookup table was added: build it once
+    db = SessionLocal()
+    try:
+        if db.query(AssetLookup).first() is None and get_all_table_schemas(db):
+            print(rebuild_lookup(db)["message"])
+    finally:
+        db.close()
+
+
+def lookup_asset(identifier: str, db: Session):
+    rows = db.execute(
+        text("SELECT category FROM asset_lookup WHERE identifier = :identifier ORDER BY category"),
+        {"identifier": identifier},
+    ).fetchall()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Asset not found with the given identifier")
+    return {"identifier": identifier, "categories": [row.category for row in rows]}
+
+
+if __name__ == "__main__":
+    # python lookup.py rebuild
+    if sys.argv[1:] != ["rebuild"]:
+        print("usage: python lookup.py rebuild")
+        sys.exit(1)
+    session = SessionLocal()
+    try:
+        print(rebuild_lookup(session))
+    finally:
+        session.close()
@@ -1,23 +1,43 @@
 from importlib import metadata
 from io import BytesIO
+from datetime import datetime
+import time
 from typing import Dict, List
 from docx import Document
-from fastapi import APIRouter, FastAPI,  Depends, File, HTTPException, UploadFile
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, FastAPI,  Depends, File, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 import pandas as pd
 from sqlalchemy import Column, Engine, String, Table, inspect
 from sqlalchemy.orm import Session, joinedload
-from asset import  add_fields_to_category, create_category, add_asset, delete_asset, delete_category, delete_field_from_category, get_categories,normalize_column_name,upload_excel_and_create_tables
-from auth import get_current_user, login_user, register_user, require_admin
-from models import  Base, CategoryInfo,SessionLocal, User,get_db 
+from asset import  create_category, add_asset, add_assets_bulk, delete_asset, delete_category, get_categories,normalize_column_name,upload_excel_and_create_tables, upload_excel_streaming
+from auth import delete_user, get_current_user, get_current_user_async, login_user, oauth2_scheme, register_user, require_admin, revoke_token, update_user_role
+from models import  Base, CategoryInfo,SessionLocal, User, async_engine, get_async_db, get_db, sqlite_settings_report
+from sqlalchemy.ext.asyncio import AsyncSession
+import asset_async
 from fastapi import Body
 from fastapi import Query
-from asset import search_asset
-from schemas import CategoryCreate, AssetInput, CategoryDelete,  FieldDeleteRequest, ReassignAssetInput, UserCreate
-from schemas import UserLogin, TokenResponse
+from asset import list_assets, search_asset
+from schemas import BatchReassignInput, BulkAssetInput, CategoryAlter, CategoryCreate, AssetInput, CategoryDelete,  FieldDeleteRequest, ReassignAssetInput, UserCreate
+from schemas import UserLogin, TokenResponse, UserRoleUpdate
+from schema_registry import get_all_table_schemas, get_catalog_payload, get_table_schema
+from search_index import rebuild_search_index, search_assets
+from schema_changes import add_fields_to_category, apply_schema_changes, delete_field_from_category
+from statements import statement_cache_stats
+from indexes import index_report
+from lookup import rebuild_lookup, seed_lookup_if_empty
+from history import asset_history, category_as_of
+from slow_queries import slow_query_report
+from metrics import METRICS_ENABLED, finish_request, render_metrics, server_timing, start_request
+from counters import reconcile_counters, seed_counters_if_empty
+from export import CSV_MEDIA_TYPE, XLSX_MEDIA_TYPE, ZIP_MEDIA_TYPE, iter_csv, iter_xlsx, iter_zip
+from jobs import enqueue_excel_import, get_import_job, list_import_jobs, resume_import_jobs
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi import UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from typing import Optional
+import json
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
@@ -40,8 +60,54 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag"],
 )
 
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    if not METRICS_ENABLED:
+        return await call_next(request)
+    stats = start_request()
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Streaming bodies are still being sent at this point, so this is the
+    # time to the first byte
+    elapsed = time.perf_counter() - started
+    route = request.scope.get("route")
+    finish_request(request.method, route.path if route else "unmatched", response.status_code, elapsed, stats)
+    response.headers["Server-Timing"] = server_timing(elapsed, stats)
+    return response
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+@app.on_event("startup")
+def resume_background_jobs():
+    settings = sqlite_settings_report()
+    if settings:
+        print("SQLite settings:", ", ".join(f"{k}={v}" for k, v in settings.items()))
+    seed_counters_if_empty()
+    seed_lookup_if_empty()
+    resume_import_jobs()
+
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await async_engine.dispose()
+
 # ---------- CREATE CATEGORY ENDPOINT ----------
 @app.post("/create-category")
 def create_category_endpoint(
@@ -57,12 +123,19 @@ def create_category_endpoint(
 # 🚀 Get all categories and their fields
 @app.get("/get-categories")
 def get_categories_endpoint(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role.lower() != "admin":
         raise HTTPException(status_code=403, detail="Only admins can get categories")
-    return get_categories(db)
+
+    # Served from the in-memory copy; an unchanged catalog is a 304
+    etag, body = get_catalog_payload(db)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.post("/add-fields")
@@ -85,6 +158,17 @@ def delete_field_endpoint(
         raise HTTPException(status_code=403, detail="Only admins can delete fields")
     return delete_field_from_category(request.category_name, request.field_name, db)
 
+# Add, drop and retype fields of a category in one transaction
+@app.post("/alter-category")
+def alter_category_endpoint(
+    data: CategoryAlter,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can change fields")
+    return apply_schema_changes(data.category_name.lower().replace(" ", "_"), data.changes, db)
+
 @app.post("/delete-category")
 def delete_category_endpoint(
     data: CategoryDelete,
@@ -97,27 +181,80 @@ def delete_category_endpoint(
 
 #  Insert data into dynamic table
 @app.post("/add-asset")
-def add_asset_endpoint(
+async def add_asset_endpoint(
     asset: AssetInput = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can add assets")
+    return await asset_async.add_asset(asset, db)
+
+
+# Insert many rows into one category: JSON {"table_name", "rows"} or NDJSON with ?table_name=
+@app.post("/add-assets/bulk")
+async def add_assets_bulk_endpoint(
+    request: Request,
+    table_name: Optional[str] = Query(None, description="Target table, required for NDJSON bodies"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role.lower() != "admin":
         raise HTTPException(status_code=403, detail="Only admins can add assets")
-    return add_asset(asset, db)
+
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            if not table_name:
+                raise HTTPException(status_code=400, detail="table_name query parameter is required for NDJSON")
+            rows = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            payload = BulkAssetInput(**json.loads(body))
+            table_name, rows = payload.table_name, payload.rows
+    except (ValueError, TypeError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid bulk payload: {str(e)}")
+
+    if not all(isinstance(row, dict) for row in rows):
+        raise HTTPException(status_code=422, detail="Every row must be a JSON object")
+
+    return await run_in_threadpool(add_assets_bulk, table_name, rows, db)
 
 
 @app.post("/upload-excel")
-def upload_excel_endpoint(file: UploadFile = File(...), db: Session = Depends(get_db),current_user: User = Depends(get_current_user)):
+def upload_excel_endpoint(
+    file: UploadFile = File(...),
+    mode: str = Query("dataframe", description="'dataframe' (default) or 'stream' for row-by-row import of large files"),
+    background: bool = Query(False, description="Queue the import as a background job and return its id"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
     if current_user.role.lower() != "admin":
         raise HTTPException(status_code=403, detail="Only admins can upload excel data")
+    if background:
+        return enqueue_excel_import(file, db, submitted_by=current_user.username)
+    if mode == "stream":
+        return upload_excel_streaming(file, db)
     return upload_excel_and_create_tables(file, db)
 
 
 
+@app.get("/import-jobs")
+def list_import_jobs_endpoint(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
+    return list_import_jobs(db)
+
+
+@app.get("/import-jobs/{job_id}")
+def import_job_status_endpoint(job_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
+    return get_import_job(job_id, db)
+
+
 @app.get("/admin-only")
 def admin_route(user=Depends(require_admin)):
-    return {"message": f"Welcome admin {user['username']}"}
+    return {"message": f"Welcome admin {user.username}"}
 
 
 @app.post("/register")
@@ -133,105 +270,180 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     return login_user(form_data, db)
 
 
+@app.post("/logout")
+def logout(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return revoke_token(token, db)
+
+
+@app.put("/users/role")
+def update_user_role_endpoint(data: UserRoleUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can change roles")
+    return update_user_role(data.mail, data.role, db)
+
+
+@app.delete("/users")
+def delete_user_endpoint(
+    mail: str = Query(..., description="Mail of the user to delete"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can delete users")
+    return delete_user(mail, db)
+
+
 @app.get("/search-asset")
-def search_asset_endpoint(
+async def search_asset_endpoint(
     table_name: str = Query(..., description="Table name to search (e.g., laptop, mobile)"),
     identifier: str = Query(..., description="Asset Tag or Asset Code"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
+
+    return await asset_async.search_asset(table_name, identifier, db)
+
+@app.get("/lookup/{identifier}")
+async def lookup_asset_endpoint(
+    identifier: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
+    return await asset_async.lookup_asset(identifier, db)
+
+
+@app.post("/lookup/rebuild")
+def rebuild_lookup_endpoint(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
+    return rebuild_lookup(db)
+
+@app.get("/assets")
+def list_assets_endpoint(
+    table_name: str = Query(..., description="Category table to list"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=500, description="Page size"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
+
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    return list_assets(table_name, db, cursor=cursor, limit=limit, fields=field_list)
+
+@app.get("/asset-history")
+def asset_history_endpoint(
+    identifier: str = Query(..., description="Asset Tag or Asset Code"),
+    table_name: Optional[str] = Query(None, description="Limit to one category"),
+    limit: int = Query(100, ge=1, le=1000),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.role.lower() != "admin":
         raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
+    return asset_history(identifier, db, table_name=table_name, limit=limit)
 
-    return search_asset(table_name, identifier, db)
+@app.get("/assets/as-of")
+def assets_as_of_endpoint(
+    table_name: str = Query(..., description="Category table"),
+    as_of: datetime = Query(..., description="UTC timestamp, e.g. 2025-01-31T18:00:00"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
+    return category_as_of(table_name, as_of, db)
+
+@app.get("/search")
+def search_endpoint(
+    q: str = Query(..., min_length=1, description="Free text, e.g. a model name, user or tag"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
+    return search_assets(q, db, limit=limit)
+
+
+@app.post("/search/rebuild")
+def rebuild_search_endpoint(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
+    return rebuild_search_index(db)
+
+@app.get("/statement-cache")
+def statement_cache_endpoint(current_user: User = Depends(get_current_user)):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
+    return statement_cache_stats()
+
+@app.get("/category-indexes")
+def category_indexes_endpoint(
+    table_name: Optional[str] = Query(None, description="Limit the report to one category"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
+    return index_report(db, table_name)
+
+@app.get("/slow-queries")
+def slow_queries_endpoint(
+    limit: int = Query(20, ge=1, le=200, description="Number of statements to return"),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
+    return slow_query_report(limit)
 
 @app.delete("/delete-asset")
-def delete_asset_endpoint(
+async def delete_asset_endpoint(
     table_name: str = Query(..., description="Table name to delete from (e.g., laptop, mobile)"),
     identifier: str = Query(..., description="Asset Tag or Asset Code"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
     # Ensure that the user is an admin
     if current_user.role.lower() != "admin":
         raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
 
     # Call the delete_asset function to handle the deletion
-    return delete_asset(table_name, identifier, db)
-
-def check_asset_column_exists(table_name: str, db_session, column_name: str):
-    # Query to check if the column exists in the given table
-    query = text(f"PRAGMA table_info({table_name});")
-    result = db_session.execute(query).fetchall()
-    
-    # Check if the column exists in the result (column name is at index 1 in the tuple)
-    for column in result:
-        if column[1] == column_name:  # column[1] is the name of the column
-            return True
-    return False
+    return await asset_async.delete_asset(table_name, identifier, db)
+
 @app.put("/reassign-asset")
-async def reassign_asset(data: ReassignAssetInput, db: Session = Depends(get_db)):
-    if not check_asset_column_exists(data.table_name, db, 'asset_tag') and not check_asset_column_exists(data.table_name, db, 'asset_code'):
-        raise HTTPException(
-            status_code=400,
-            detail="Table must have either 'asset tag' or 'asset code' column."
-        )
-
-    update_fields = {
-        "user_name": data.user_name,
-        "user_id": data.user_id,
-        "email": data.email,
-        "department": data.department,
-        "location": data.location,
-        "section": data.section,
-        "date_of_return": data.date_of_return,
-        "date_of_reassign": data.date_of_reassign,
-        "date_of_update": data.date_of_update,
-        "remarks": data.remarks,
-    }
-
-    # Check if all fields exist in the table before proceeding
-    missing_fields = [
-        field for field in update_fields.keys()
-        if not check_asset_column_exists(data.table_name, db, field)
-    ]
-    if missing_fields:
-        raise HTTPException(
-            status_code=400,
-            detail=f"The following fields are missing in the table '{data.table_name}': {', '.join(missing_fields)}"
-        )
-
-    # Now handle the actual asset reassignment
-    result = db.execute(text(f'''
-        SELECT * FROM "{data.table_name}"
-        WHERE "asset_tag" = :identifier OR "asset_code" = :identifier
-    '''), {"identifier": data.identifier})
-    asset = result.fetchone()
-
-    if not asset:
-        raise HTTPException(status_code=404, detail="Asset not found")
-
-    valid_fields = {k: v for k, v in update_fields.items() if v is not None}
-    if not valid_fields:
-        raise HTTPException(status_code=400, detail="No valid fields to update.")
-
-    set_clause = ", ".join([f'"{key}" = :{key}' for key in valid_fields])
-    update_query = text(f'''
-        UPDATE "{data.table_name}"
-        SET {set_clause}
-        WHERE "asset_tag" = :identifier OR "asset_code" = :identifier
-    ''')
-
-    valid_fields["identifier"] = data.identifier
-    db.execute(update_query, valid_fields)
-    db.commit()
-
-    return {"message": f"Asset reassigned in table '{data.table_name}' for identifier '{data.identifier}'"}
+async def reassign_asset(data: ReassignAssetInput, db: AsyncSession = Depends(get_async_db)):
+    return await asset_async.reassign_asset(data, db)
+
 
+# Reassign many assets of one category in a single transaction
+@app.put("/reassign-assets/bulk")
+async def reassign_assets_bulk_endpoint(
+    data: BatchReassignInput,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can reassign assets")
+    return await asset_async.reassign_assets_batch(data, db)
 
+
+# CSV is streamed as rows are read. XLSX (the default) is buffered: the whole
+# workbook is written to a temp file before the first byte is sent, so large
+# tables only get an early first byte with format=csv.
 @app.get("/download-table")
 def download_table(
     table_name: str = Query(..., description="Name of the table to export"),
+    format: str = Query(
+        "xlsx", pattern="^(xlsx|csv)$",
+        description="xlsx (default; built on disk before sending) or csv (streamed as rows are read)",
+    ),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -243,79 +455,56 @@ def download_table(
 
     excluded_tables = {"category_info", "users"}
 
-    try:
-        if normalized_table_name in excluded_tables:
-            raise HTTPException(status_code=400, detail=f"Export of '{normalized_table_name}' is not allowed")
+    if normalized_table_name in excluded_tables:
+        raise HTTPException(status_code=400, detail=f"Export of '{normalized_table_name}' is not allowed")
 
-        inspector = inspect(db.bind)
-        if normalized_table_name not in inspector.get_table_names():
-            raise HTTPException(status_code=404, detail="Table not found")
+    if not get_table_schema(normalized_table_name, db):
+        raise HTTPException(status_code=404, detail="Table not found")
 
-        df = pd.read_sql_table(normalized_table_name, db.bind)
-        excel_buffer = BytesIO()
+    # Rows are paged from the table; CSV goes out as they are read, XLSX once
+    # the workbook is complete
+    if format == "csv":
+        body, media_type = iter_csv(normalized_table_name), CSV_MEDIA_TYPE
+    else:
+        body, media_type = iter_xlsx(normalized_table_name), XLSX_MEDIA_TYPE
 
-        with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name=normalized_table_name, index=False)
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={normalized_table_name}.{format}"}
+    )
+
+
+@app.get("/download-all-tables")
+def download_all_tables(
+    format: str = Query("xlsx", pattern="^(xlsx|csv)$", description="File format of each category inside the zip"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
 
-        excel_buffer.seek(0)
-        return StreamingResponse(
-            excel_buffer,
-            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            headers={"Content-Disposition": f"attachment; filename={normalized_table_name}.xlsx"}
-        )
+    table_names = sorted(get_all_table_schemas(db))
+    if not table_names:
+        raise HTTPException(status_code=404, detail="No categories to export")
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        iter_zip(table_names, format),
+        media_type=ZIP_MEDIA_TYPE,
+        headers={"Content-Disposition": "attachment; filename=all_assets.zip"}
+    )
 
 
 @app.get("/dashboard-stats")
-def dashboard_stats(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def dashboard_stats(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
     if current_user.role.lower() != "admin":
         raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
+    return await asset_async.get_dashboard_stats(db)
 
-    # Total categories
-    categories = db.query(CategoryInfo).all()
-    total_categories = len(categories)
-
-    # Total users
-    total_users = db.query(User).count()
-
-    # Asset stats
-    total_assets = 0
-    asset_counts_by_category: Dict[str, int] = {}
-    active_asset_counts_by_category: Dict[str, int] = {}
-
-    for cat in categories:
-        table_name = cat.tablename
-        try:
-            # Count all assets
-            total_query = text(f'SELECT COUNT(*) FROM "{table_name}"')
-            total_count = db.execute(total_query).scalar()
-            asset_counts_by_category[table_name] = total_count
-            total_assets += total_count
-
-            # Check if "status" column exists
-            status_check_query = text(f"PRAGMA table_info('{table_name}')")
-            columns = db.execute(status_check_query).fetchall()
-            column_names = [col[1] for col in columns]
-
-            if "asset_status" in column_names:
-                active_query = text(f"SELECT COUNT(*) FROM '{table_name}' WHERE asset_status = 'Active'")
-                active_count = db.execute(active_query).scalar()
-            else:
-                active_count = 0
-
-            active_asset_counts_by_category[table_name] = active_count
-
-        except Exception as e:
-            asset_counts_by_category[table_name] = 0
-            active_asset_counts_by_category[table_name] = 0
-
-    return {
-        "categories": total_categories,
-        "assets": total_assets,
-        "users": total_users,
-        "asset_counts_by_category": asset_counts_by_category,
-        "active_asset_counts_by_category": active_asset_counts_by_category
-    }
+
+@app.post("/dashboard-stats/reconcile")
+def reconcile_dashboard_stats(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Access forbidden: Admins only")
+    return reconcile_counters(db)
 
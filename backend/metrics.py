@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+
+# Per-request performance numbers. The HTTP middleware in main.py opens a
+# stats dict for every request; the cursor hooks installed by
+# instrument_engine() add each SQL statement's time and affected rows to it,
+# and the engines' pools (models.TimedQueuePool) add the time spent waiting for
+# a connection. Totals are kept per route and served in Prometheus text format
+# at /metrics; the same numbers for one request go out in its Server-Timing
+# header. SQL run outside a request (background imports) is counted under
+# route "-".
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+STATEMENT_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 500]
+
+_request_stats: ContextVar[Optional[dict]] = ContextVar("request_stats", default=None)
+_lock = threading.Lock()
+_requests: Dict[tuple, int] = {}         # (method, route, status) -> count
+_latency: Dict[tuple, list] = {}         # (method, route) -> [bucket counts..., sum, count]
+_statements: Dict[tuple, list] = {}      # (method, route) -> [bucket counts..., sum, count]
+_sql: Dict[str, list] = {}               # route -> [statements, seconds, rows affected, pool wait seconds, checkouts]
+
+
+def _new_stats() -> dict:
+    return {"sql_count": 0, "sql_seconds": 0.0, "rows_affected": 0, "pool_wait": 0.0, "checkouts": 0}
+
+
+def start_request() -> dict:
+    stats = _new_stats()
+    _request_stats.set(stats)
+    return stats
+
+
+def _current() -> Optional[dict]:
+    return _request_stats.get()
+
+
+def record_pool_wait(seconds: float):
+    stats = _current()
+    if stats is None:
+        with _lock:
+            totals = _sql.setdefault("-", [0, 0.0, 0, 0.0, 0])
+            totals[3] += seconds
+            totals[4] += 1
+        return
+    stats["pool_wait"] += seconds
+    stats["checkouts"] += 1
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    # Rows affected by writes only: statements that return rows have no
+    # portable count before they are fetched (SQLite reports -1), so none
+    # is published for them rather than a misleading zero
+    rows = max(cursor.rowcount or 0, 0) if cursor.description is None else 0
+    stats = _current()
+    if stats is None:
+        with _lock:
+            totals = _sql.setdefault("-", [0, 0.0, 0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += elapsed
+            totals[2] += rows
+        return
+    stats["sql_count"] += 1
+    stats["sql_seconds"] += elapsed
+    stats["rows_affected"] += rows
+
+
+def instrument_engine(sync_engine):
+    # Pass engine, or async_engine.sync_engine for the async one
+    if METRICS_ENABLED and not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _observe(table: Dict[tuple, list], key: tuple, buckets: list, value: float):
+    counts = table.setdefault(key, [0] * (len(buckets) + 2))
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            counts[i] += 1
+    counts[-2] += value
+    counts[-1] += 1
+
+
+def finish_request(method: str, route: str, status: int, seconds: float, stats: dict):
+    with _lock:
+        _requests[(method, route, status)] = _requests.get((method, route, status), 0) + 1
+        _observe(_latency, (method, route), LATENCY_BUCKETS, seconds)
+        _observe(_statements, (method, route), STATEMENT_BUCKETS, stats["sql_count"])
+        totals = _sql.setdefault(route, [0, 0.0, 0, 0.0, 0])
+        totals[0] += stats["sql_count"]
+        totals[1] += stats["sql_seconds"]
+        totals[2] += stats["rows_affected"]
+        totals[3] += stats["pool_wait"]
+        totals[4] += stats["checkouts"]
+
+
+def server_timing(seconds: float, stats: dict) -> str:
+    return (
+        f'app;dur={seconds * 1000:.2f}, '
+        f'db;dur={stats["sql_seconds"] * 1000:.2f};desc="{stats["sql_count"]} statements, rows_affected={stats["rows_affected"]}", '
+        f'pool;dur={stats["pool_wait"] * 1000:.2f}'
+    )
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram(lines: list, name: str, help_text: str, table: Dict[tuple, list], buckets: list):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route), counts in sorted(table.items()):
+        for bound, count in zip(buckets, counts):
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=bound)} {count}")
+        lines.append(f"{name}_bucket{_labels(method=method, route=route, le='+Inf')} {counts[-1]}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {counts[-2]:.6f}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {counts[-1]}")
+
+
+def render_metrics() -> str:
+    lines = []
+    with _lock:
+        lines.append("# HELP http_requests_total Requests handled, by route and status")
+        lines.append("# TYPE http_requests_total counter")
+        for (method, route, status), count in sorted(_requests.items()):
+            lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+        _histogram(lines, "http_request_duration_seconds", "Time to the start of the response",
+                   _latency, LATENCY_BUCKETS)
+        _histogram(lines, "db_statements_per_request", "SQL statements issued per request",
+                   _statements, STATEMENT_BUCKETS)
+
+        for index, (name, kind, help_text) in enumerate([
+            ("db_statements_total", "counter", "SQL statements executed"),
+            ("db_statement_seconds_total", "counter", "Time spent executing SQL"),
+            ("db_rows_affected_total", "counter", "Rows inserted, updated or deleted"),
+            ("db_pool_wait_seconds_total", "counter", "Time spent waiting for a pooled connection"),
+            ("db_pool_checkouts_total", "counter", "Pooled connections checked out"),
+        ]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for route, totals in sorted(_sql.items()):
+                value = totals[index]
+                lines.append(f"{name}{_labels(route=route)} {value:.6f}" if isinstance(value, float)
+                             else f"{name}{_labels(route=route)} {value}")
+    return "\n".join(lines) + "\n"
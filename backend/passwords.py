@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+# Password hashing runs in a dedicated process pool so a burst of logins
+# burns CPU there instead of holding the GIL in the API process, and each
+# endpoint gets a concurrency cap so login storms are turned away with 429
+# rather than queueing behind every other request. A request that finds no
+# free slot is refused at once, so waiting logins never hold threadpool
+# threads. Spawned workers import this module (passlib and fastapi) rather
+# than the whole app.
+
+PASSWORD_SCHEMES = [s.strip() for s in os.getenv("PASSWORD_SCHEMES", "bcrypt").split(",") if s.strip()]
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+LOGIN_CONCURRENCY = int(os.getenv("LOGIN_CONCURRENCY", "8"))
+REGISTER_CONCURRENCY = int(os.getenv("REGISTER_CONCURRENCY", "4"))
+
+# The first scheme hashes new passwords; hashes in the others (or bcrypt
+# hashes with a different cost) are upgraded on the next successful login
+pwd_context = CryptContext(schemes=PASSWORD_SCHEMES, deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_pool = None
+_pool_lock = threading.Lock()
+_limits = {
+    "login": threading.BoundedSemaphore(LOGIN_CONCURRENCY),
+    "register": threading.BoundedSemaphore(REGISTER_CONCURRENCY),
+}
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str):
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def hash_password(password: str) -> str:
+    return _get_pool().submit(_hash, password).result()
+
+
+def verify_and_update(password: str, hashed_password: str):
+    # (verified, new_hash); new_hash is set when the stored hash is outdated
+    return _get_pool().submit(_verify_and_update, password, hashed_password).result()
+
+
+@contextmanager
+def hashing_slot(endpoint: str):
+    semaphore = _limits[endpoint]
+    if not semaphore.acquire(blocking=False):
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many {endpoint} requests in progress, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        yield
+    finally:
+        semaphore.release()
@@ -0,0 +1,274 @@
+import time
+from typing import Dict, List
+
+from fastapi import HTTPException
+from sqlalchemy import Column, Index, MetaData, Table, inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.types import NullType
+
+from asset import column_coercer, sql_type_map
+from counters import recount_category
+from indexes import create_field_indexes, drop_column_indexes, wants_index
+from lookup import rebuild_category_lookup
+from models import CategoryInfo
+from schema_registry import IDENTIFIER_COLUMNS, invalidate_table_schema, load_table_schema
+from schemas import CategoryCreate, FieldChange
+from search_index import rebuild_category_index
+
+# Field changes on a category table. A batch of add / drop / retype
+# operations runs in one transaction together with the CategoryInfo update,
+# so either all of it lands or none of it does. Added columns are a plain
+# ALTER TABLE ADD COLUMN. Retyping, and dropping on SQLite (whose DROP COLUMN
+# rewrites the table anyway and refuses key or indexed columns), rebuild the
+# table instead: the final layout is created under a scratch name, rows are
+# copied over in chunks with retyped values converted, the old table is
+# dropped and the new one renamed into place with its indexes. The search
+# index, lookup and counters of the category are refreshed in the same
+# transaction when a column they read changed.
+# MySQL commits DDL implicitly, so there the batch is not atomic.
+
+COPY_CHUNK_SIZE = 1000
+# Conversion failures listed in the error before the batch is refused
+MAX_REPORTED_FAILURES = 10
+
+
+def _begin(db: Session):
+    # pysqlite only opens a transaction ahead of DML, so DDL issued first
+    # would autocommit; take the write lock up front instead
+    conn = db.connection()
+    if conn.dialect.name == "sqlite" and not conn.connection.dbapi_connection.in_transaction:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    return conn
+
+
+def _normalize(name: str) -> str:
+    return name.lower().replace(" ", "_")
+
+
+def _converter(type_name: str):
+    coerce = column_coercer(type_name)
+
+    def convert(value):
+        if value is None or (value == "" and type_name != "string"):
+            return None
+        if type_name == "string":
+            return value if isinstance(value, str) else str(value)
+        return coerce(value)
+    return convert
+
+
+def _plan(table_name: str, columns: Dict[str, object], changes: List[FieldChange]) -> dict:
+    seen = set()
+    added, dropped, retyped = [], [], {}
+    for change in changes:
+        # Existing columns are matched as stored, new ones named the way
+        # create_category names them
+        name = change.name if change.op != "add" and change.name in columns else _normalize(change.name)
+        if name in seen:
+            raise HTTPException(status_code=400, detail=f"Field '{name}' appears in more than one change")
+        seen.add(name)
+
+        if change.op == "add":
+            if name in columns:
+                raise HTTPException(
+                    status_code=400, detail=f"Field '{name}' already exists in category '{table_name}'"
+                )
+            if change.type not in sql_type_map:
+                raise HTTPException(status_code=400, detail=f"Invalid field type for '{name}': {change.type}")
+            added.append({"name": name, "type": change.type, "indexed": change.indexed})
+        else:
+            if name not in columns:
+                raise HTTPException(status_code=404, detail=f"Field '{name}' does not exist in category")
+            if change.op == "drop":
+                dropped.append(name)
+            elif change.type not in sql_type_map:
+                raise HTTPException(status_code=400, detail=f"Invalid field type for '{name}': {change.type}")
+            else:
+                retyped[name] = change.type
+
+    remaining = [c for c in columns if c not in dropped] + [f["name"] for f in added]
+    if not remaining:
+        raise HTTPException(status_code=400, detail="A category needs at least one field")
+    if any(c in columns for c in IDENTIFIER_COLUMNS) and not any(c in remaining for c in IDENTIFIER_COLUMNS):
+        raise HTTPException(status_code=400, detail="One of 'asset tag' or 'asset code' is required ")
+    return {"added": added, "dropped": dropped, "retyped": retyped}
+
+
+def _copy_rows(conn, table_name: str, scratch: str, columns: List[str], retyped: Dict[str, str]) -> int:
+    converters = {name: _converter(type_name) for name, type_name in retyped.items()}
+    column_sql = ", ".join(f'"{c}"' for c in columns)
+    result = conn.execute(
+        text(f'SELECT {column_sql} FROM "{table_name}"').execution_options(stream_results=True)
+    )
+    # Untyped, so values that are not converted are written back exactly as read
+    insert = Table(scratch, MetaData(), *[Column(c, NullType()) for c in columns]).insert()
+
+    copied = 0
+    while True:
+        rows = result.fetchmany(COPY_CHUNK_SIZE)
+        if not rows:
+            break
+        batch, failures = [], []
+        for offset, row in enumerate(rows):
+            values = dict(row._mapping)
+            for name, convert in converters.items():
+                try:
+                    values[name] = convert(values[name])
+                except (TypeError, ValueError):
+                    failures.append(f"row {copied + offset}: {values[name]!r} is not a valid {retyped[name]} for '{name}'")
+            batch.append(values)
+        if failures:
+            raise HTTPException(
+                status_code=400,
+                detail="Cannot convert existing values: " + "; ".join(failures[:MAX_REPORTED_FAILURES]),
+            )
+        conn.execute(insert, batch)
+        copied += len(batch)
+    return copied
+
+
+def _rebuild(conn, table_name: str, plan: dict, inspector) -> int:
+    catalog_columns = inspector.get_columns(table_name)
+    old_key = inspector.get_pk_constraint(table_name).get("constrained_columns") or []
+    old_indexes = inspector.get_indexes(table_name)
+
+    kept = [c["name"] for c in catalog_columns if c["name"] not in plan["dropped"]]
+    key = [c for c in old_key if c in kept]
+    if old_key and not key:
+        # The key column went; the remaining identifier takes its place
+        key = [c for c in IDENTIFIER_COLUMNS if c in kept][:1]
+
+    scratch = f"{table_name}__rebuild"
+    conn.execute(text(f'DROP TABLE IF EXISTS "{scratch}"'))
+    columns = []
+    for col in catalog_columns:
+        if col["name"] in plan["dropped"]:
+            continue
+        new_type = plan["retyped"].get(col["name"])
+        col_type = sql_type_map[new_type] if new_type else col["type"]
+        columns.append(Column(col["name"], col_type, primary_key=col["name"] in key))
+    for field in plan["added"]:
+        columns.append(Column(field["name"], sql_type_map[field["type"]]))
+    Table(scratch, MetaData(), *columns).create(bind=conn)
+
+    copied = _copy_rows(conn, table_name, scratch, kept, plan["retyped"])
+    conn.execute(text(f'DROP TABLE "{table_name}"'))
+    conn.execute(text(f'ALTER TABLE "{scratch}" RENAME TO "{table_name}"'))
+
+    # Indexes went with the old table; put back every one whose columns all
+    # survived, except a plain index on what is now the leading key
+    table = Table(table_name, MetaData(), *[Column(c.name) for c in columns])
+    for ix in old_indexes:
+        if not all(c in kept for c in ix["column_names"]):
+            continue
+        if not ix.get("unique") and key and ix["column_names"] == key[:1]:
+            continue
+        Index(ix["name"], *[table.c[c] for c in ix["column_names"]], unique=bool(ix.get("unique"))).create(bind=conn)
+    return copied
+
+
+def apply_schema_changes(table_name: str, changes: List[FieldChange], db: Session):
+    if not changes:
+        raise HTTPException(status_code=400, detail="At least one change is required")
+
+    started = time.perf_counter()
+    try:
+        conn = _begin(db)
+        cat_info = db.query(CategoryInfo).filter_by(tablename=table_name).first()
+        inspector = inspect(conn)
+        if not cat_info or not inspector.has_table(table_name):
+            raise HTTPException(status_code=404, detail=f"Table '{table_name}' does not exist")
+
+        columns = {c["name"]: c["type"] for c in inspector.get_columns(table_name)}
+        plan = _plan(table_name, columns, changes)
+        rebuild = bool(plan["retyped"]) or (bool(plan["dropped"]) and conn.dialect.name == "sqlite")
+
+        rows_copied = 0
+        if rebuild:
+            rows_copied = _rebuild(conn, table_name, plan, inspector)
+        else:
+            indexes = {ix["name"]: ix["column_names"] for ix in inspector.get_indexes(table_name)}
+            for name in plan["dropped"]:
+                drop_column_indexes(conn, {"indexes": indexes}, name)
+                conn.execute(text(f'ALTER TABLE "{table_name}" DROP COLUMN "{name}"'))
+            for field in plan["added"]:
+                sql_type = sql_type_map[field["type"]]().compile(dialect=conn.dialect)
+                conn.execute(text(f'ALTER TABLE "{table_name}" ADD COLUMN "{field["name"]}" {sql_type}'))
+
+        fields = []
+        for field in cat_info.tablefields or []:
+            name = field.get("name")
+            if name in plan["dropped"]:
+                continue
+            fields.append({**field, "type": plan["retyped"][name]} if name in plan["retyped"] else field)
+        fields += plan["added"]
+        cat_info.tablefields = fields
+        db.flush()
+
+        schema = load_table_schema(table_name, db)
+        create_field_indexes(conn, table_name, [
+            f["name"] for f in plan["added"] if wants_index(f["name"], f["indexed"], schema["primary_key"])
+        ])
+
+        # Refresh what reads the changed columns; added columns start out
+        # empty, so they change nothing
+        touched = set(plan["dropped"]) | set(plan["retyped"])
+        if touched:
+            rebuild_category_index(conn, table_name, schema)
+        if touched & set(IDENTIFIER_COLUMNS):
+            rebuild_category_lookup(conn, table_name, schema)
+        if "asset_status" in touched:
+            recount_category(conn, table_name, schema)
+        db.commit()
+    except HTTPException:
+        db.rollback()
+        raise
+    except IntegrityError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Existing rows conflict with the new key: {e.orig}")
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Schema change failed: {str(e)}")
+    finally:
+        invalidate_table_schema(table_name)
+
+    duration_ms = round((time.perf_counter() - started) * 1000, 3)
+    print(f"Schema change on {table_name}: {len(changes)} change(s), "
+          f"{rows_copied} rows copied in {duration_ms} ms")
+    return {
+        "message": f"Schema of category '{table_name}' updated",
+        "table": table_name,
+        "added": [f["name"] for f in plan["added"]],
+        "dropped": plan["dropped"],
+        "retyped": plan["retyped"],
+        "rebuilt": rebuild,
+        "rows_copied": rows_copied,
+        "duration_ms": duration_ms,
+        "fields": fields,
+    }
+
+
+def add_fields_to_category(data: CategoryCreate, db: Session):
+    category = _normalize(data.category_name)
+    if not data.fields:
+        raise HTTPException(status_code=400, detail="At least one new field is required")
+
+    report = apply_schema_changes(category, [
+        FieldChange(op="add", name=f.name, type=f.type, indexed=f.indexed) for f in data.fields
+    ], db)
+    return {
+        "message": f"Fields added to category '{category}'",
+        "added_fields": report["added"],
+        "updated_fields": report["fields"],
+        "duration_ms": report["duration_ms"],
+    }
+
+
+def delete_field_from_category(category_name: str, field_name: str, db: Session):
+    report = apply_schema_changes(category_name, [FieldChange(op="drop", name=field_name)], db)
+    return {
+        "message": f"Field '{field_name}' deleted successfully from category '{category_name}'",
+        "rows_copied": report["rows_copied"],
+        "duration_ms": report["duration_ms"],
+    }
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import insert, inspect, update
+from sqlalchemy.orm import Session
+
+from models import CatalogVersion, CategoryInfo, engine
+
+# In-process cache of the structure of every dynamic category table, keyed by
+# table name. Entries are built from CategoryInfo plus the database catalog the
+# first time they are needed and dropped by the schema-changing functions in
+# asset.py, so hot endpoints never have to hit the catalog themselves.
+# Each invalidation also bumps the shared catalog_version row; every schema
+# lookup in other worker processes compares it at most every
+# CATALOG_CHECK_SECONDS and drops their cached entries when it moved.
+
+IDENTIFIER_COLUMNS = ["asset_tag", "asset_code"]
+CATALOG_CHECK_SECONDS = float(os.getenv("CATALOG_CHECK_SECONDS", "1"))
+
+_schemas: Dict[str, dict] = {}
+_fully_loaded = False
+_lock = threading.RLock()
+
+# Local catalog version, bumped on every invalidation, and the serialized
+# /get-categories body (with its ETag) built for a given version
+_catalog_version = 0
+_catalog_payload: Optional[Tuple[int, str, bytes]] = None
+# Last value read from the shared catalog_version row, and when
+_shared_version: Optional[int] = None
+_shared_checked_at = 0.0
+
+
+def _build_schema(cat_info: CategoryInfo, inspector) -> Optional[dict]:
+    table_name = cat_info.tablename
+    try:
+        catalog_columns = inspector.get_columns(table_name)
+        pk_columns = inspector.get_pk_constraint(table_name).get("constrained_columns") or []
+        catalog_indexes = inspector.get_indexes(table_name)
+    except Exception as e:
+        print(f"Schema lookup failed for table '{table_name}': {e}")
+        return None
+
+    columns = {col["name"]: str(col["type"]).lower() for col in catalog_columns}
+    return {
+        "table": table_name,
+        "fields": cat_info.tablefields or [],
+        "columns": columns,
+        "primary_key": pk_columns[0] if pk_columns else None,
+        "key_columns": pk_columns,
+        "identifier_columns": [c for c in IDENTIFIER_COLUMNS if c in columns],
+        "indexes": {ix["name"]: ix["column_names"] for ix in catalog_indexes},
+    }
+
+
+def _load_all(db: Session):
+    global _fully_loaded
+    inspector = inspect(db.connection())
+    for cat_info in db.query(CategoryInfo).all():
+        if cat_info.tablename in _schemas:
+            continue
+        schema = _build_schema(cat_info, inspector)
+        if schema:
+            _schemas[cat_info.tablename] = schema
+    _fully_loaded = True
+
+
+def get_table_schema(table_name: str, db: Session) -> Optional[dict]:
+    # Returns {"table", "fields", "columns", "primary_key", "key_columns",
+    # "identifier_columns", "indexes"}
+    # for a category table, or None if the category does not exist.
+    _sync_shared_version(db)
+    schema = _schemas.get(table_name)
+    if schema is not None:
+        return schema
+
+    with _lock:
+        if not _fully_loaded:
+            _load_all(db)
+        elif table_name not in _schemas:
+            cat_info = db.query(CategoryInfo).filter_by(tablename=table_name).first()
+            if cat_info:
+                schema = _build_schema(cat_info, inspect(db.connection()))
+                if schema:
+                    _schemas[table_name] = schema
+        return _schemas.get(table_name)
+
+
+def load_table_schema(table_name: str, db: Session) -> Optional[dict]:
+    # Read straight from CategoryInfo and the catalog, bypassing the cache:
+    # for a schema change that is still running in db's transaction
+    cat_info = db.query(CategoryInfo).filter_by(tablename=table_name).first()
+    return _build_schema(cat_info, inspect(db.connection())) if cat_info else None
+
+
+def get_all_table_schemas(db: Session) -> Dict[str, dict]:
+    _sync_shared_version(db)
+    with _lock:
+        if not _fully_loaded:
+            _load_all(db)
+        return dict(_schemas)
+
+
+def _drop_cached(table_name: Optional[str]):
+    global _fully_loaded, _catalog_version
+    with _lock:
+        if table_name is None:
+            _schemas.clear()
+        else:
+            _schemas.pop(table_name, None)
+        _fully_loaded = False
+        _catalog_version += 1
+
+
+def invalidate_table_schema(table_name: Optional[str] = None):
+    # Drop one table's entry (or everything when table_name is None) so the
+    # next lookup re-reads it from CategoryInfo and the catalog. Other cached
+    # tables are kept; only the category list is re-read.
+    _drop_cached(table_name)
+    # Call after the schema change committed or rolled back: the bump is its
+    # own transaction
+    try:
+        with engine.begin() as conn:
+            bumped = conn.execute(
+                update(CatalogVersion).where(CatalogVersion.id == 1).values(version=CatalogVersion.version + 1)
+            )
+            if bumped.rowcount == 0:
+                conn.execute(insert(CatalogVersion).values(id=1, version=1))
+    except Exception as e:
+        print(f"Catalog version bump failed: {e}")
+
+
+def _sync_shared_version(db: Session):
+    # Pick up schema changes made by other worker processes
+    global _shared_version, _shared_checked_at
+    now = time.monotonic()
+    if now - _shared_checked_at < CATALOG_CHECK_SECONDS:
+        return
+    _shared_checked_at = now
+    version = db.query(CatalogVersion.version).filter(CatalogVersion.id == 1).scalar() or 0
+    if _shared_version is not None and version != _shared_version:
+        _drop_cached(None)
+    _shared_version = version
+
+
+def get_catalog_payload(db: Session) -> Tuple[str, bytes]:
+    # (ETag, JSON body) of the category list. Between checks of the shared
+    # version nothing is read from the database; the body is rebuilt only
+    # when the catalog changed. The ETag is a content hash, so workers with
+    # the same catalog hand out the same one.
+    global _catalog_payload
+    _sync_shared_version(db)
+    cached = _catalog_payload
+    if cached and cached[0] == _catalog_version:
+        return cached[1], cached[2]
+
+    version = _catalog_version
+    body = json.dumps([
+        {"table": r.tablename, "fields": r.tablefields}
+        for r in db.query(CategoryInfo).all()
+    ]).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    _catalog_payload = (version, etag, body)
+    return etag, body
@@ -8,6 +8,7 @@ from sqlalchemy import Column, Integer, String
 class FieldDefinition(BaseModel):
     name: str
     type: Literal["string", "integer", "float", "boolean", "date"]
+    indexed: bool = False
 
 class CategoryCreate(BaseModel):
     category_name: str
@@ -17,6 +18,17 @@ class FieldDeleteRequest(BaseModel):
     category_name: str
     field_name: str
 
+class FieldChange(BaseModel):
+    # "add" and "retype" need a type; "indexed" only applies to "add"
+    op: Literal["add", "drop", "retype"]
+    name: str
+    type: Optional[Literal["string", "integer", "float", "boolean", "date"]] = None
+    indexed: bool = False
+
+class CategoryAlter(BaseModel):
+    category_name: str
+    changes: List[FieldChange]
+
 class CategoryDelete(BaseModel):
     category_name: str
 
@@ -24,6 +36,10 @@ class AssetInput(BaseModel):
     table_name: str
     data: Dict[str, Any]
 
+class BulkAssetInput(BaseModel):
+    table_name: str
+    rows: List[Dict[str, Any]]
+
 class ReassignAssetInput(BaseModel):
     table_name: str
     identifier: str  
@@ -38,6 +54,29 @@ class ReassignAssetInput(BaseModel):
     date_of_update: Optional[date] = None
     remarks: Optional[str] = None
 
+class ReassignChanges(BaseModel):
+    user_name: Optional[str] = None
+    user_id: Optional[str] = None
+    email: Optional[str] = None
+    department: Optional[str] = None
+    location: Optional[str] = None
+    section: Optional[str] = None
+    date_of_return: Optional[date] = None
+    date_of_reassign: Optional[date] = None
+    date_of_update: Optional[date] = None
+    remarks: Optional[str] = None
+
+class ReassignItem(ReassignChanges):
+    identifier: str
+
+class BatchReassignInput(BaseModel):
+    # `identifiers` all get `changes`; `items` carry their own values, which
+    # override `changes` field by field
+    table_name: str
+    identifiers: List[str] = []
+    changes: Optional[ReassignChanges] = None
+    items: List[ReassignItem] = []
+
 
 class TokenResponse(BaseModel):
     access_token: str
@@ -50,6 +89,10 @@ class UserCreate(BaseModel):
     password: str
     role: str = "User"
 
+class UserRoleUpdate(BaseModel):
+    mail: str
+    role: str
+
 class UserLogin(BaseModel):
     mail: str
     password: str
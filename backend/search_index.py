@@ -0,0 +1,214 @@
+import re
+import sys
+from typing import Dict, Iterable, List
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from models import SessionLocal, engine
+from schema_registry import get_all_table_schemas
+from statements import select_all, select_by
+
+# Full-text index over every category table, backed by SQLite FTS5. On other
+# databases the index is disabled and /search answers 503.
+# asset_search_docs maps (category, identifier) to the FTS rowid so a single
+# asset can be replaced or removed through the primary key instead of a scan
+# of the virtual table. Callers pass the Session/Connection of the write they
+# are indexing so the index changes commit (or roll back) with the data.
+
+REBUILD_CHUNK_SIZE = 1000
+# Keeps IN (...) lists well under SQLite's bound-parameter limit
+WRITE_CHUNK_SIZE = 500
+
+
+def _create_search_tables():
+    if engine.dialect.name != "sqlite":
+        print(f"Full-text search disabled: FTS5 index needs SQLite, not {engine.dialect.name}")
+        return False
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS asset_search_docs ("
+                " id INTEGER PRIMARY KEY,"
+                " category TEXT NOT NULL,"
+                " identifier TEXT NOT NULL,"
+                " UNIQUE (category, identifier))"
+            ))
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS asset_search "
+                "USING fts5(content, tokenize = 'unicode61')"
+            ))
+        return True
+    except Exception as e:
+        print(f"Full-text search disabled: {e}")
+        return False
+
+
+SEARCH_ENABLED = _create_search_tables()
+
+
+def _row_content(row: Dict) -> str:
+    return " ".join(str(v) for v in row.values() if v is not None and str(v) != "")
+
+
+def _identifier(row: Dict, schema: dict):
+    for col in schema["identifier_columns"]:
+        if row.get(col) not in (None, ""):
+            return str(row[col])
+    return None
+
+
+def _delete_docs(conn, table_name: str, identifiers: List[str]):
+    if not identifiers:
+        return
+    lookup = text(
+        "SELECT id FROM asset_search_docs WHERE category = :category AND identifier IN :identifiers"
+    ).bindparams(bindparam("identifiers", expanding=True))
+    ids = [r[0] for r in conn.execute(lookup, {"category": table_name, "identifiers": identifiers})]
+    if ids:
+        conn.execute(
+            text("DELETE FROM asset_search WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)),
+            {"ids": ids},
+        )
+        conn.execute(
+            text("DELETE FROM asset_search_docs WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+            {"ids": ids},
+        )
+
+
+def index_assets(conn, table_name: str, schema: dict, rows: Iterable[Dict]):
+    # Add or replace the index entries for full rows of one category
+    if not SEARCH_ENABLED or not schema or not schema["identifier_columns"]:
+        return
+    docs = {}
+    for row in rows:
+        identifier = _identifier(row, schema)
+        if identifier is not None:
+            docs[identifier] = _row_content(row)
+
+    lookup = text(
+        "SELECT id, identifier FROM asset_search_docs WHERE category = :category AND identifier IN :identifiers"
+    ).bindparams(bindparam("identifiers", expanding=True))
+    identifiers = list(docs)
+    for start in range(0, len(identifiers), WRITE_CHUNK_SIZE):
+        chunk = identifiers[start:start + WRITE_CHUNK_SIZE]
+        _delete_docs(conn, table_name, chunk)
+        conn.execute(
+            text("INSERT INTO asset_search_docs (category, identifier) VALUES (:category, :identifier)"),
+            [{"category": table_name, "identifier": identifier} for identifier in chunk],
+        )
+        ids = conn.execute(lookup, {"category": table_name, "identifiers": chunk}).fetchall()
+        conn.execute(
+            text("INSERT INTO asset_search (rowid, content) VALUES (:id, :content)"),
+            [{"id": r.id, "content": docs[r.identifier]} for r in ids],
+        )
+
+
+def reindex_asset(conn, table_name: str, schema: dict, identifier: str):
+    # Re-read one asset after an in-place update and replace its entry
+    if not SEARCH_ENABLED or not schema or not schema["identifier_columns"]:
+        return
+    rows = conn.execute(select_by(schema, schema["identifier_columns"]), {"identifier": identifier}).fetchall()
+    index_assets(conn, table_name, schema, [dict(row._mapping) for row in rows])
+
+
+def remove_assets(conn, table_name: str, schema: dict, rows: Iterable[Dict]):
+    # rows are the deleted assets; their entries are keyed the way
+    # index_assets keyed them, whichever identifier the caller deleted by
+    if not SEARCH_ENABLED or not schema:
+        return
+    identifiers = list(dict.fromkeys(i for i in (_identifier(row, schema) for row in rows) if i is not None))
+    for start in range(0, len(identifiers), WRITE_CHUNK_SIZE):
+        _delete_docs(conn, table_name, identifiers[start:start + WRITE_CHUNK_SIZE])
+
+
+def remove_category(conn, table_name: str):
+    if not SEARCH_ENABLED:
+        return
+    conn.execute(
+        text("DELETE FROM asset_search WHERE rowid IN (SELECT id FROM asset_search_docs WHERE category = :category)"),
+        {"category": table_name},
+    )
+    conn.execute(text("DELETE FROM asset_search_docs WHERE category = :category"), {"category": table_name})
+
+
+def _index_table(conn, table_name: str, schema: dict) -> int:
+    result = conn.execute(select_all(schema))
+    total = 0
+    while True:
+        rows = result.fetchmany(REBUILD_CHUNK_SIZE)
+        if not rows:
+            break
+        index_assets(conn, table_name, schema, [dict(row._mapping) for row in rows])
+        total += len(rows)
+    return total
+
+
+def rebuild_category_index(conn, table_name: str, schema: dict) -> int:
+    # Re-index one category after its columns changed
+    if not SEARCH_ENABLED:
+        return 0
+    remove_category(conn, table_name)
+    if not schema or not schema["identifier_columns"]:
+        return 0
+    return _index_table(conn, table_name, schema)
+
+
+def rebuild_search_index(db: Session):
+    if not SEARCH_ENABLED:
+        raise HTTPException(status_code=503, detail="Full-text search is not available on this database")
+
+    db.execute(text("DELETE FROM asset_search"))
+    db.execute(text("DELETE FROM asset_search_docs"))
+    counts = {}
+    for table_name, schema in get_all_table_schemas(db).items():
+        if not schema["identifier_columns"]:
+            continue
+        counts[table_name] = _index_table(db, table_name, schema)
+    db.commit()
+    return {"message": "Search index rebuilt", "indexed": counts}
+
+
+def _match_expression(query: str) -> str:
+    # Quote every term so user input is never parsed as FTS syntax; the last
+    # term is a prefix match so partial tags and names still hit.
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query must contain letters or digits")
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search_assets(q: str, db: Session, limit: int = 50):
+    if not SEARCH_ENABLED:
+        raise HTTPException(status_code=503, detail="Full-text search is not available on this database")
+
+    sql = text(
+        "SELECT d.category, d.identifier, "
+        "snippet(asset_search, 0, '[', ']', '...', 12) AS snippet, bm25(asset_search) AS score "
+        "FROM asset_search JOIN asset_search_docs d ON d.id = asset_search.rowid "
+        "WHERE asset_search MATCH :match ORDER BY score LIMIT :limit"
+    )
+    rows = db.execute(sql, {"match": _match_expression(q), "limit": limit}).fetchall()
+    return {
+        "query": q,
+        "count": len(rows),
+        "results": [
+            {"category": r.category, "identifier": r.identifier, "snippet": r.snippet, "score": round(-r.score, 4)}
+            for r in rows
+        ],
+    }
+
+
+if __name__ == "__main__":
+    # python search_index.py rebuild
+    if sys.argv[1:] != ["rebuild"]:
+        print("usage: python search_index.py rebuild")
+        sys.exit(1)
+    session = SessionLocal()
+    try:
+        print(rebuild_search_index(session))
+    finally:
+        session.close()
@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Dict
+
+from sqlalchemy import event
+
+# Slow-query log. Every statement that takes longer than SLOW_QUERY_MS is
+# written as one JSON line to a rotating file with its duration, the shape of
+# its parameters (names and types, never the values) and the database's plan
+# for it, and added to an in-process summary that /slow-queries ranks by
+# total time. A negative SLOW_QUERY_MS turns the log off. Each worker process
+# writes and summarizes its own statements.
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", os.path.join("logs", "slow_queries.log"))
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "3"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes")
+# Distinct statements kept in the summary; the cheapest one makes room
+SLOW_QUERY_TRACKED = int(os.getenv("SLOW_QUERY_TRACKED", "500"))
+
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")
+
+_summary: Dict[str, dict] = {}
+_lock = threading.Lock()
+_logger = None
+
+
+def _get_logger():
+    global _logger
+    if _logger is None:
+        directory = os.path.dirname(SLOW_QUERY_LOG)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        logger = logging.getLogger("asset.slow_queries")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = RotatingFileHandler(
+            SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_MAX_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        _logger = logger
+    return _logger
+
+
+def _normalize(statement: str) -> str:
+    return re.sub(r"\s+", " ", statement).strip()
+
+
+def _param_shape(parameters, executemany: bool):
+    if executemany:
+        first = parameters[0] if parameters else None
+        return {"batch": len(parameters), "row": _param_shape(first, False)}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+def _explain(conn, statement: str, parameters, executemany: bool):
+    if not SLOW_QUERY_EXPLAIN or not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    # A separate raw cursor on the same connection: no events fire, and the
+    # statement's own cursor is left alone
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return [" ".join(str(col) for col in row) if conn.dialect.name != "sqlite" else str(row[-1])
+                    for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except Exception as e:
+        return [f"EXPLAIN failed: {e}"]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["slow_query_started"].pop()) * 1000
+    if elapsed_ms < SLOW_QUERY_MS:
+        return
+
+    normalized = _normalize(statement)
+    plan = _explain(conn, statement, parameters, executemany)
+    entry = {
+        "at": datetime.utcnow().isoformat(timespec="milliseconds"),
+        "duration_ms": round(elapsed_ms, 3),
+        "statement": normalized,
+        "parameters": _param_shape(parameters, executemany),
+        "plan": plan,
+    }
+    _get_logger().info(json.dumps(entry, default=str))
+
+    with _lock:
+        stats = _summary.get(normalized)
+        if stats is None:
+            if len(_summary) >= SLOW_QUERY_TRACKED:
+                del _summary[min(_summary, key=lambda s: _summary[s]["total_ms"])]
+            stats = _summary[normalized] = {"statement": normalized, "count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        stats["count"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        stats["last_seen"] = entry["at"]
+        stats["last_plan"] = plan
+
+
+def install_slow_query_log(sync_engine):
+    # Pass engine, or async_engine.sync_engine for the async one
+    if SLOW_QUERY_MS >= 0 and not event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def slow_query_report(limit: int = 20) -> dict:
+    with _lock:
+        top = sorted(_summary.values(), key=lambda s: s["total_ms"], reverse=True)[:limit]
+        offenders = []
+        for stats in top:
+            plan = stats.get("last_plan") or []
+            offenders.append({
+                **stats,
+                "total_ms": round(stats["total_ms"], 3),
+                "max_ms": round(stats["max_ms"], 3),
+                "mean_ms": round(stats["total_ms"] / stats["count"], 3),
+                # SQLite reports a table walk as "SCAN <table>", PostgreSQL as "Seq Scan"
+                "full_scan": any(line.startswith("SCAN ") or "Seq Scan" in line for line in plan),
+            })
+    return {
+        "threshold_ms": SLOW_QUERY_MS,
+        "log_file": os.path.abspath(SLOW_QUERY_LOG),
+        "tracked_statements": len(_summary),
+        "top": offenders,
+    }
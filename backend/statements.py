@@ -0,0 +1,179 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Column, Integer, MetaData, Table, bindparam, delete, func, insert, or_, select, tuple_, update
+from sqlalchemy.types import NullType
+
+# Cache of SQLAlchemy Core statements for the dynamic category tables, keyed
+# by (operation, table, column set). Tables are built from the schema
+# registry, so every table and column name is one that exists in the catalog
+# and is quoted by SQLAlchemy; caller input only ever reaches the database as
+# bound parameters. Reusing the same construct also lets SQLAlchemy's own
+# compiled cache skip recompiling it.
+# Columns are untyped so values round-trip exactly as they did with text().
+
+STATEMENT_CACHE_SIZE = int(os.getenv("STATEMENT_CACHE_SIZE", "1000"))
+
+_tables: Dict[str, Tuple[dict, Table]] = {}
+_statements: "OrderedDict[tuple, object]" = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_lock = threading.Lock()
+
+
+def _table(schema: dict) -> Table:
+    # One Table per registry entry; a new entry (after a schema change) means
+    # the table's statements are stale too
+    name = schema["table"]
+    entry = _tables.get(name)
+    if entry and entry[0] is schema:
+        return entry[1]
+    table = Table(name, MetaData(), *[
+        Column(col, NullType(), primary_key=(col == schema["primary_key"]))
+        for col in schema["columns"]
+    ])
+    _tables[name] = (schema, table)
+    for key in [k for k in _statements if k[1] == name]:
+        del _statements[key]
+    return table
+
+
+def _check_columns(schema: dict, columns: Iterable[str]):
+    unknown = [c for c in columns if c not in schema["columns"]]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown column(s): {', '.join(unknown)}")
+
+
+def _cached(op: str, schema: dict, columns: tuple, build):
+    with _lock:
+        table = _table(schema)
+        key = (op, schema["table"], columns)
+        stmt = _statements.get(key)
+        if stmt is not None:
+            _stats["hits"] += 1
+            _statements.move_to_end(key)
+            return stmt
+        _stats["misses"] += 1
+        stmt = build(table)
+        _statements[key] = stmt
+        if len(_statements) > STATEMENT_CACHE_SIZE:
+            _statements.popitem(last=False)
+            _stats["evictions"] += 1
+        return stmt
+
+
+def _match_any(table: Table, where_columns: tuple):
+    return or_(*[table.c[col] == bindparam("identifier") for col in where_columns])
+
+
+def select_by(schema: dict, where_columns: Iterable[str], columns: Iterable[str] = None):
+    # SELECT <columns or *> WHERE any of where_columns = :identifier
+    where_columns = tuple(where_columns)
+    columns = tuple(columns) if columns else ()
+    _check_columns(schema, where_columns + columns)
+    return _cached(
+        "select", schema, (where_columns, columns),
+        lambda t: select(*[t.c[c] for c in columns] or [t]).where(_match_any(t, where_columns)),
+    )
+
+
+def select_in(schema: dict, where_columns: Iterable[str], columns: Iterable[str] = None):
+    # SELECT <columns or *> WHERE any of where_columns IN :identifiers (expanding)
+    where_columns = tuple(where_columns)
+    columns = tuple(columns) if columns else ()
+    _check_columns(schema, where_columns + columns)
+    return _cached(
+        "select_in", schema, (where_columns, columns),
+        lambda t: select(*[t.c[c] for c in columns] or [t]).where(
+            or_(*[t.c[c].in_(bindparam("identifiers", expanding=True)) for c in where_columns])
+        ),
+    )
+
+
+def select_all(schema: dict, columns: Iterable[str] = None):
+    # SELECT <columns or *> over the whole table, for rebuilds and snapshots
+    columns = tuple(columns) if columns else ()
+    _check_columns(schema, columns)
+    return _cached("select_all", schema, columns, lambda t: select(*[t.c[c] for c in columns] or [t]))
+
+
+def count_rows(schema: dict, group_column: str = None):
+    # SELECT COUNT(*), or (COALESCE(group_column, '') AS value, COUNT(*) AS n) per value
+    if group_column:
+        _check_columns(schema, [group_column])
+
+    def build(t):
+        if not group_column:
+            return select(func.count()).select_from(t)
+        value = func.coalesce(t.c[group_column], "")
+        return select(value.label("value"), func.count().label("n")).group_by(value)
+    return _cached("count", schema, (group_column,), build)
+
+
+def select_keys_in(schema: dict, key_columns: Iterable[str]):
+    # SELECT key_columns WHERE (key_columns) IN :keys (expanding); keys are
+    # tuples for a composite key and plain values for a single column
+    key_columns = tuple(key_columns)
+    _check_columns(schema, key_columns)
+
+    def build(t):
+        key = tuple_(*[t.c[c] for c in key_columns]) if len(key_columns) > 1 else t.c[key_columns[0]]
+        return select(*[t.c[c] for c in key_columns]).where(key.in_(bindparam("keys", expanding=True)))
+    return _cached("select_keys_in", schema, key_columns, build)
+
+
+def select_page(schema: dict, key_columns: Iterable[str], columns: Iterable[str], after: bool):
+    # SELECT columns [WHERE (key_columns) > (:k0, :k1, ...)] ORDER BY key_columns
+    # LIMIT :limit, for keyset pagination
+    key_columns, columns = tuple(key_columns), tuple(columns)
+    _check_columns(schema, key_columns + columns)
+
+    def build(t):
+        stmt = select(*[t.c[c] for c in columns])
+        if after:
+            bounds = [bindparam(f"k{i}") for i in range(len(key_columns))]
+            if len(key_columns) > 1:
+                stmt = stmt.where(tuple_(*[t.c[c] for c in key_columns]) > tuple_(*bounds))
+            else:
+                stmt = stmt.where(t.c[key_columns[0]] > bounds[0])
+        return stmt.order_by(*[t.c[c] for c in key_columns]).limit(bindparam("limit", type_=Integer))
+    return _cached("select_page", schema, (key_columns, columns, after), build)
+
+
+def insert_row(schema: dict, columns: Iterable[str]):
+    # Execute with {column: value} parameters
+    columns = tuple(sorted(columns))
+    _check_columns(schema, columns)
+    return _cached("insert", schema, columns, lambda t: insert(t).values({c: bindparam(c) for c in columns}))
+
+
+def update_by(schema: dict, set_columns: Iterable[str], where_columns: Iterable[str]):
+    # Execute with {"set_<column>": value, ..., "identifier": value}
+    set_columns, where_columns = tuple(sorted(set_columns)), tuple(where_columns)
+    _check_columns(schema, set_columns + where_columns)
+    return _cached(
+        "update", schema, (set_columns, where_columns),
+        lambda t: update(t).where(_match_any(t, where_columns)).values(
+            {c: bindparam(f"set_{c}") for c in set_columns}
+        ),
+    )
+
+
+def delete_by(schema: dict, where_columns: Iterable[str]):
+    where_columns = tuple(where_columns)
+    _check_columns(schema, where_columns)
+    return _cached("delete", schema, where_columns, lambda t: delete(t).where(_match_any(t, where_columns)))
+
+
+def statement_cache_stats() -> dict:
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "hit_ratio": round(_stats["hits"] / lookups, 4) if lookups else None,
+            "statements": len(_statements),
+            "tables": len(_tables),
+            "max_size": STATEMENT_CACHE_SIZE,
+        }
@@ -0,0 +1,57 @@
+# Regression checks for the Excel import's type coercion.
+#
+#   python -m pytest backend/tests
+import os
+import sys
+import tempfile
+from io import BytesIO
+
+import pytest
+
+# The app reads DATABASE_URL on import, so point it at a scratch database first
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "import_test.db")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pandas as pd
+from fastapi import HTTPException
+from openpyxl import Workbook
+from sqlalchemy import Integer, inspect, text
+
+from asset import upload_excel_streaming
+from excel import coerce_column
+from models import SessionLocal, engine
+
+
+def _workbook(rows):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Printer")
+    ws.append(["Asset Tag", "Qty"])
+    for row in rows:
+        ws.append(row)
+    out = BytesIO()
+    wb.save(out)
+    out.seek(0)
+    return out
+
+
+def test_integer_column_reports_fractional_and_oversized_values():
+    values, lost = coerce_column(pd.Series([1, 2.5, None, 2 ** 70, 4.0]), Integer)
+    assert values == [1, None, None, None, 4]
+    assert lost == [1, 3]
+
+
+def test_stream_refuses_float_chunk_after_integer_chunk():
+    # Chunk 1 makes qty an Integer column; chunk 2 holds 1000.5, 1001.5, ...
+    rows = [[f"P{i}", i] for i in range(1000)] + [[f"P{i}", i + 0.5] for i in range(1000, 1010)]
+    db = SessionLocal()
+    try:
+        with pytest.raises(HTTPException) as raised:
+            upload_excel_streaming(_workbook(rows), db, chunk_size=1000)
+    finally:
+        db.close()
+
+    assert raised.value.status_code == 400
+    assert "data row 1001: 1000.5 in 'qty'" in raised.value.detail
+    if inspect(engine).has_table("printer"):
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM printer WHERE asset_tag = 'P1001'")).scalar() == 0
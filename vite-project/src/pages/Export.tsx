@@ -52,7 +52,7 @@ const Export = () => {
 
       <div className="flex flex-col gap-4">
         <button
-          onClick={() => downloadFile("http://127.0.0.1:8000/download-all-tables", "all_assets.xlsx")}
+          onClick={() => downloadFile("http://127.0.0.1:8000/download-all-tables", "all_assets.zip")}
           className="bg-green-600 text-white px-4 py-2 rounded w-fit"
         >
           Export All Tables